@@ -4,10 +4,19 @@
 # Email: iriantsoa.rasoloarivalona@efrei.net
 # Student ID: 20220747
 
-from sections import intro, technical,  overview, deep_drives, conclusion
-from utils.io import show_license
+import importlib
+from utils.io import load_star_schema, show_license, WARM_UP
 import streamlit as st
 
+# Page label -> module in sections/, imported only when the page is opened
+PAGES = {
+    "Introduction": "intro",
+    "Technical Notes and Preparation": "technical",
+    "National and regional trends": "overview",
+    "Detailed regional analyses": "deep_drives",
+    "Final insights and conclusions": "conclusion",
+}
+
 # Setting page configuration
 st.set_page_config(page_title="Data Storytelling Dashboard", layout="wide")
 
@@ -18,24 +27,22 @@ st.write("By Iriantsoa RASOLOARIVALONA - Data Visualization Project - Efrei Pari
 st.sidebar.header("Navigation")
 st.sidebar.title("🚔 Delinquency Analysis")
 page = st.sidebar.selectbox(
-    "Choose a section to explore:", ["Introduction", "Technical Notes and Preparation", "National and regional trends", "Detailed regional analyses", "Final insights and conclusions"]
+    "Choose a section to explore:", list(PAGES)
 )
 show_license()
 
+# Optional background warm-up of the regional deep dives, started by the first session
+if WARM_UP:
+    from utils.viz import start_warm_up
+    schema = load_star_schema()
+    if schema is not None:
+        start_warm_up(schema, schema.version)
+
 
 
 
 # Load the selected page
-if page == "Introduction":
-    intro.show()
-elif page == "Technical Notes and Preparation":
-    technical.show()
-elif page == "National and regional trends":
-    overview.show()
-elif page == "Detailed regional analyses":
-    deep_drives.show()
-elif page == "Final insights and conclusions":
-    conclusion.show()
+importlib.import_module(f"sections.{PAGES[page]}").show()
 
 
 
@@ -0,0 +1,225 @@
+# Timing and peak memory of the data preparation and aggregation hot paths.
+#
+# Runs against the real CSV (scale 1) and synthetic copies of it scaled 10x and
+# 100x: the rows are repeated under new department codes of the same regions,
+# so every (department, year, indicator, unit) key stays unique and the data
+# grows like a finer geographic breakdown.
+# Streamlit-cached functions are called unwrapped, so every run recomputes.
+#
+# Each benchmark reports the best and median wall time over --repeat runs, then
+# the peak of Python-tracked allocations over one more run (tracemalloc: numpy
+# and pandas buffers; memory held in Arrow's own pool is not counted).
+#
+# Usage (from the project root):
+#   python benchmarks/aggregations.py [--scales 1 10 100] [--repeat 5] [--output results.json]
+#   python benchmarks/aggregations.py --compare before.json after.json [--threshold 1.1]
+# --compare exits with status 1 when a benchmark got slower than the threshold ratio.
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from utils import io, prep, viz
+
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.1
+
+
+def scaled_raw(raw, scale):
+    """
+    The raw rows repeated `scale` times. Copy k > 0 renames every department
+    "<code>.<k>" within the same region, like a finer (communal) breakdown.
+    """
+    copies = [raw if k == 0 else raw.assign(Code_departement=raw["Code_departement"] + f".{k}") for k in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def write_raw_csv(raw, path):
+    """Write raw rows in the format of the source CSV (';', quoted fields, decimal comma)."""
+    raw.to_csv(path, sep=";", decimal=",", index=False, quoting=1)
+
+
+def measure(func, repeat):
+    """Best and median wall time of `repeat` runs, then the tracemalloc peak of one more run."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), statistics.median(times), peak / 1e6
+
+
+def selections(schema):
+    """
+    A selection of the whole dataset and a narrow one: infractions of one crime
+    type over the last two years. The narrow entity is "Infraction" so the
+    infraction-only charts (crime rate by population) have rows to aggregate.
+    """
+    national = schema.table("national")
+    first_year, last_year = int(national["year"].min()), int(national["year"].max())
+    infractions = national[national["entity_involved"] == "Infraction"]
+    return {
+        "all": ("All", (first_year, last_year), "All"),
+        "narrow": ("Infraction", (last_year - 1, last_year), infractions["crime_type"].iloc[0]),
+    }
+
+
+def benchmarks(raw, csv_path, version):
+    """(name, callable) pairs for one dataset, in the order the app runs them."""
+    clean = prep.clean_data(raw)
+    schema = prep.build_star_schema(clean, version=version)
+    io.write_cached_data(clean, version)
+    region = sorted(schema.regions["Region_name"])[0]
+    national = schema.table("national")
+    region_data = viz.get_records_by_region(schema, "department", region)
+    region_totals = viz.get_records_by_region(schema, "region", region)
+
+    def load_cold():
+        # read_clean_data on a cache miss, but parsing the scaled CSV instead of DATA_PATH
+        data = prep.clean_data(io.read_csv_typed(csv_path))
+        io.write_cached_data(data, version)
+        return data
+
+    cases = [
+        ("io.read_csv_typed", lambda: io.read_csv_typed(csv_path)),
+        ("prep.clean_data", lambda: prep.clean_data(raw)),
+        ("io.read_clean_data:cold", load_cold),
+        ("io.read_clean_data:warm", lambda: io.read_clean_data(version)),
+        ("prep.build_star_schema", lambda: prep.build_star_schema(clean, version=version)),
+        ("viz.crime_type_contribution_by_entity", lambda: viz.contributions_by_entity(national)),
+        ("viz.temporal_trends", lambda: viz.yearly_crime_type_totals(national)),
+        ("viz.show_region_overview", lambda: viz.region_baseline.__wrapped__(schema, version)),
+        ("viz.select_region_for_analysis", lambda: viz.get_records_by_region(schema, "department", region)),
+        ("viz.show_region_departments_comparison", lambda: viz.department_comparison.__wrapped__(schema, version, region)),
+        ("viz.show_region_crime_distribution", lambda: viz.crime_type_amounts(region_totals)),
+        ("viz.show_region_entity_distribution", lambda: viz.entity_summary(region_totals)),
+        ("viz.show_region_temporal_trends", lambda: viz.yearly_amounts(region_totals)),
+        ("viz.show_crime_analysis_by_demographics",
+         lambda: viz.department_summary(region_data, schema, population=True)),
+    ]
+    for label, selection in selections(schema).items():
+        cases += [
+            (f"viz.create_filters[{label}]",
+             lambda s=selection: (national["records"].sum(), viz.selection_counts.__wrapped__(schema, version, s))),
+            (f"viz.entity_distribution[{label}]", lambda s=selection: viz.entity_counts.__wrapped__(schema, version, s)),
+            (f"viz.map_records_by_region[{label}]", lambda s=selection: viz.region_amounts.__wrapped__(schema, version, s)),
+            (f"viz.crime_rate_analysis[{label}]",
+             lambda s=selection: (viz.rate_statistics.__wrapped__(schema, version, s),
+                                  viz.rate_histogram.__wrapped__(schema, version, s, 30, kde=True))),
+            (f"viz.geographic_insights[{label}]", lambda s=selection: viz.department_rates.__wrapped__(schema, version, s)),
+            (f"viz.crime_rate_by_population[{label}]",
+             lambda s=selection: viz.infraction_population_summary.__wrapped__(schema, version, s)),
+            (f"viz.data_quality[{label}]", lambda s=selection: viz.selection_quality.__wrapped__(schema, version, s)),
+        ]
+    return cases
+
+
+def git_commit():
+    """Commit of the working tree, with a '+dirty' suffix when it has changes; None outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}+dirty" if dirty else commit
+
+
+def run(scales, repeat):
+    """Run every benchmark at every scale; return the results document."""
+    raw = io.read_csv_typed(os.path.join(ROOT, io.DATA_PATH))
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # Cached artifacts of the synthetic datasets stay out of data/cache
+        io.CACHE_DIR = workdir
+        for scale in scales:
+            data = scaled_raw(raw, scale)
+            csv_path = os.path.join(workdir, f"delinquency-{scale}x.csv")
+            write_raw_csv(data, csv_path)
+            for name, func in benchmarks(data, csv_path, version=f"bench-{scale}x"):
+                best, median, peak_mb = measure(func, repeat)
+                results.append({"benchmark": name, "scale": scale, "rows": len(data),
+                                "best_s": best, "median_s": median, "peak_mb": peak_mb})
+                print(f"{name:<48} {scale:>4}x {median * 1000:10.1f} ms {peak_mb:9.1f} MB", flush=True)
+    meta = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+        "platform": platform.platform(),
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(before_path, after_path, threshold):
+    """Print the median time ratio after/before of every benchmark; return the regressions."""
+    with open(before_path) as f:
+        before = {(r["benchmark"], r["scale"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    regressions = []
+    for result in after:
+        key = (result["benchmark"], result["scale"])
+        if key not in before:
+            continue
+        ratio = result["median_s"] / before[key]["median_s"]
+        status = "SLOWER" if ratio > threshold else ("faster" if ratio < 1 / threshold else "")
+        print(f"{key[0]:<48} {key[1]:>4}x {before[key]['median_s'] * 1000:10.1f} -> "
+              f"{result['median_s'] * 1000:10.1f} ms  x{ratio:5.2f}  {status}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timing and peak memory of the prep and viz hot paths.")
+    parser.add_argument("--scales", nargs="+", type=int, default=DEFAULT_SCALES, help="dataset scales to run")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="median time ratio above which --compare reports a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than x{args.threshold}")
+            sys.exit(1)
+        return
+
+    os.chdir(ROOT)
+    document = run(args.scales, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Import-time budget of the dashboard pages.
+#
+# Each page module is imported in a fresh interpreter with `python -X importtime`,
+# after streamlit itself (which every page pays for anyway). The report shows
+# what the page adds on top of streamlit and the heaviest packages behind it.
+#
+# Usage (from the project root):
+#   python benchmarks/import_time.py [--budget-ms 750] [--top 10] [--pages overview technical]
+# Exits with status 1 when a page goes over the budget.
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["intro", "technical", "overview", "deep_drives", "conclusion"]
+DEFAULT_BUDGET_MS = 750
+
+
+def import_times(statement):
+    """Run `statement` under -X importtime; return [(module, self_us, cumulative_us, depth)]."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def page_report(page):
+    """Cost of importing a page module on top of streamlit, and self time per top-level package."""
+    rows = import_times(f"import streamlit; import sections.{page}")
+    # Top-level entries (depth 0) are the two statements: streamlit, then the page
+    streamlit_us = sum(cumulative for name, _, cumulative, depth in rows if depth == 0 and name == "streamlit")
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    by_package = defaultdict(int)
+    after_streamlit = False
+    for name, self_us, _, depth in rows:
+        if after_streamlit:
+            by_package[name.split(".")[0]] += self_us
+        if depth == 0 and name == "streamlit":
+            after_streamlit = True
+    return (total_us - streamlit_us) / 1000, streamlit_us / 1000, by_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget of the dashboard pages.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum import time of a page on top of streamlit")
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages listed per page")
+    parser.add_argument("--pages", nargs="+", default=PAGES, choices=PAGES)
+    args = parser.parse_args()
+
+    over_budget = []
+    for page in args.pages:
+        page_ms, streamlit_ms, by_package = page_report(page)
+        status = "OK" if page_ms <= args.budget_ms else "OVER BUDGET"
+        print(f"sections.{page}: {page_ms:8.1f} ms (+ streamlit {streamlit_ms:.1f} ms)  [{status}]")
+        heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for package, self_us in heaviest:
+            print(f"    {package:<24} {self_us / 1000:8.1f} ms")
+        if page_ms > args.budget_ms:
+            over_budget.append(page)
+
+    print(f"\nBudget: {args.budget_ms:.0f} ms per page on top of streamlit")
+    if over_budget:
+        print("Over budget: " + ", ".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,17 @@
 # comparisons, distributions, drilldowns
 import streamlit as st
-from utils.io import load_data
-from utils.viz import show_deep_drives
+from utils.io import load_star_schema, WARM_UP
+from utils.viz import show_deep_drives, show_warm_up_progress, start_warm_up
 
 def show():
     st.markdown("## Deep Drives")
     
-    data = load_data()
-    show_deep_drives(data)
+    schema = load_star_schema()
+    if schema is None:
+        return
+    if WARM_UP:
+        show_warm_up_progress(start_warm_up(schema, schema.version))
+    show_deep_drives(schema)
     st.markdown("---")
     st.subheader("Summary of Detailed Regional Analyses")
 
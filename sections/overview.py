@@ -1,16 +1,17 @@
 # KPIs, high-level trends
 import streamlit as st
-import plotly.express as px
-from utils.io import load_data
+from utils.io import load_star_schema
 from utils.viz import show_kpis
 
 
 def show():
     st.markdown("## Overview")
     # Load data
-    data = load_data()
+    schema = load_star_schema()
+    if schema is None:
+        return
     st.markdown("### Summary of Key Performance Indicators (KPIs)")
-    show_kpis(data)
+    show_kpis(schema)
     st.markdown("---")
     st.subheader("Summary of National & Regional Trends")
 
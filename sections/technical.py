@@ -1,17 +1,20 @@
 # Data preparation visualization functions
 import streamlit as st
-from utils.io import load_data, load_raw_data
+from utils.io import load_star_schema, load_raw_profile, COMPACT_DATA
+from utils.prep import memory_report
 from utils.viz import show_missing_data, show_duplicates
 
 def show():
     st.markdown("## Technical Section")
     st.write("This section focuses on data preparation and cleaning steps.")
 
-    raw_data = load_raw_data()
+    profile = load_raw_profile()
+    if profile is None:
+        return
     st.markdown("### Raw Data Overview")
-    st.dataframe(raw_data.head())   
-    show_missing_data(raw_data)
-    show_duplicates(raw_data)
+    st.dataframe(profile['head'])
+    show_missing_data(profile['nullity'])
+    show_duplicates(profile['duplicates'])
 
     st.markdown("### Data Cleaning Steps")
     st.write("Converted 'taux_pour_mille' to numeric, added department and region names for better context.")
@@ -19,8 +22,36 @@ def show():
 
     st.write("---")
     st.write("## After the necessary conversion and additions:")
-    cleaned_data = load_data()
-    st.success(f"✅ Data loaded successfully! {cleaned_data.shape[0]} rows × {cleaned_data.shape[1]} columns.")
-    st.info(f"Data columns: {', '.join(cleaned_data.columns)}")
+    schema = load_star_schema()
+    if schema is None:
+        return
+    facts = schema.facts
+    st.success(f"✅ Data loaded successfully! {facts.shape[0]} rows × {facts.shape[1]} columns in the fact table.")
+    st.info(f"Data columns: {', '.join(facts.columns)}")
     st.write("### Cleaned Data Overview")
-    st.dataframe(cleaned_data.head())
+    st.dataframe(facts.head())
+
+    st.write("### Dimension Tables")
+    st.write("Names, coordinates and INSEE figures are stored once per department, region or department-year, "
+             "and only joined to the facts after aggregation.")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.write(f"**Departments** ({len(schema.departments)} rows)")
+        st.dataframe(schema.departments.head())
+    with col2:
+        st.write(f"**Regions** ({len(schema.regions)} rows)")
+        st.dataframe(schema.regions.head())
+    with col3:
+        st.write(f"**Population** ({len(schema.population)} rows)")
+        st.dataframe(schema.population.head())
+
+    st.write("### Memory Footprint")
+    report = memory_report(schema)
+    mode = "compact (categoricals, downcast numbers)" if COMPACT_DATA else "standard (set DELINQUENCY_COMPACT=1 for the compact mode)"
+    st.write(f"In-memory representation: {mode}.")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Total in memory", f"{report['bytes'].sum() / 1e6:.2f} MB")
+        st.dataframe(report.groupby('table')['bytes'].sum().sort_values(ascending=False))
+    with col2:
+        st.dataframe(report, hide_index=True)
@@ -0,0 +1,116 @@
+# fetch_and_cache against a local HTTP stand-in of the data.gouv.fr release.
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import io, prep
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """Serves server.release with an ETag and answers 304 to a matching If-None-Match."""
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        etag = '"%s"' % hashlib.sha256(self.server.release).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.server.release)))
+        self.end_headers()
+        self.wfile.write(self.server.release)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReleaseHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(io, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(io, "FETCH_STATE_PATH", str(tmp_path / "cache" / "fetch-state.json"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture(scope="module")
+def release():
+    """Header and data lines of the bundled CSV, and its last year."""
+    with open(os.path.join(ROOT, io.DATA_PATH), encoding="utf-8-sig", newline="") as f:
+        header, *lines = f.readlines()
+    last_year = max(int(line.split(";")[2].strip('"')) for line in lines)
+    return header, lines, last_year
+
+
+def year_of(line):
+    return int(line.split(";")[2].strip('"'))
+
+
+def swap_last_columns(line):
+    fields = line.rstrip("\r\n").split(";")
+    return ";".join(fields[:-2] + [fields[-1], fields[-2]]) + "\n"
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/release.csv"
+
+
+def test_new_year_is_appended_then_not_modified(server, cache_dir, tmp_path, release):
+    header, lines, last_year = release
+    old_lines = [line for line in lines if year_of(line) != last_year]
+    path = tmp_path / "delinquency.csv"
+    path.write_text(header + "".join(old_lines), encoding="utf-8")
+    cleaned = prep.clean_data(io.read_csv_typed(str(path)))
+    io.write_cached_data(cleaned, io.data_fingerprint(str(path)))
+    # A trailing blank line in the release is ignored
+    server.release = (header + "".join(lines) + "\n").encode("utf-8")
+
+    assert io.fetch_and_cache(url(server), str(path)) == [last_year]
+    new_lines = [line for line in lines if year_of(line) == last_year]
+    assert path.read_text(encoding="utf-8") == header + "".join(old_lines + new_lines)
+    appended = io.read_cached_data(io.data_fingerprint(str(path)))
+    pd.testing.assert_frame_equal(appended, prep.clean_data(io.read_csv_typed(str(path))))
+
+    assert io.fetch_and_cache(url(server), str(path)) == []
+    assert server.requests[-1].get("If-None-Match")
+    assert path.read_text(encoding="utf-8") == header + "".join(old_lines + new_lines)
+
+
+def test_header_change_replaces_the_csv(server, cache_dir, tmp_path, release):
+    header, lines, last_year = release
+    path = tmp_path / "delinquency.csv"
+    path.write_text(header + "".join(line for line in lines if year_of(line) != last_year), encoding="utf-8")
+    # Same rows, last two columns swapped
+    server.release = "".join(map(swap_last_columns, [header] + lines)).encode("utf-8")
+
+    years = io.fetch_and_cache(url(server), str(path))
+    assert years == sorted({year_of(line) for line in lines})
+    assert path.read_text(encoding="utf-8") == server.release.decode("utf-8")
+
+
+def test_validators_are_kept_per_local_csv(server, cache_dir, tmp_path, release):
+    header, lines, _ = release
+    server.release = (header + "".join(lines)).encode("utf-8")
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    io.fetch_and_cache(url(server), str(first))
+    io.fetch_and_cache(url(server), str(second))
+    assert "If-None-Match" not in server.requests[-1]
+    assert second.read_text(encoding="utf-8") == server.release.decode("utf-8")
@@ -0,0 +1,73 @@
+# Incremental updates (hot reload) must give the same dataset as a full rebuild.
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import io, prep
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return io.read_csv_typed(io.DATA_PATH)
+
+
+def updated(raw):
+    """One count revised."""
+    raw = raw.copy()
+    raw.loc[0, "nombre"] += 1000
+    return raw
+
+
+def deleted(raw):
+    """The rows of one department-year removed."""
+    return raw.drop(raw.index[(raw["Code_departement"] == "01") & (raw["annee"] == raw["annee"].max())]).reset_index(drop=True)
+
+
+def new_unit(raw):
+    """A row with a unit (entity) never seen before."""
+    row = raw.iloc[[0]].assign(unite_de_compte="Nouvelle unité", nombre=3)
+    return pd.concat([raw, row], ignore_index=True)
+
+
+def dropped_indicator(raw):
+    """Every row of one indicator (crime type) removed."""
+    return raw[raw["indicateur"] != raw["indicateur"].iloc[0]].reset_index(drop=True)
+
+
+def assert_same_schema(patched, full):
+    """
+    Same tables, and cube levels with the same groups and measures. Patched
+    levels keep their groups in place, so rows may come in another order:
+    the row indexes must then match the patched tables.
+    """
+    for name in ["facts", "departments", "regions", "population"]:
+        pd.testing.assert_frame_equal(getattr(patched, name), getattr(full, name))
+    assert list(patched.cube) == list(full.cube)
+    for level, keys in prep.CUBE_KEYS.items():
+        ordered = [frame.sort_values(keys).reset_index(drop=True) for frame in (patched.cube[level], full.cube[level])]
+        pd.testing.assert_frame_equal(*ordered)
+    for table, index in patched.indexes.items():
+        expected = prep.build_row_index(patched.table(table))
+        assert index.keys() == expected.keys()
+        for dimension, positions in expected.items():
+            assert index[dimension].keys() == positions.keys()
+            for value, rows in positions.items():
+                assert (index[dimension][value] == rows).all()
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["default", "compact"])
+@pytest.mark.parametrize("change", [updated, deleted, new_unit, dropped_indicator])
+def test_patch_matches_full_rebuild(raw, change, compact):
+    cleaned = prep.clean_data(raw)
+    schema = prep.build_star_schema(cleaned, compact=compact, version="old")
+    new_raw = change(raw)
+
+    data, changed = prep.patch_clean_data(cleaned, new_raw)
+    pd.testing.assert_frame_equal(data, prep.clean_data(new_raw))
+
+    patched = prep.patch_star_schema(schema, data, changed, compact=compact, version="new")
+    assert_same_schema(patched, prep.build_star_schema(prep.clean_data(new_raw), compact=compact, version="new"))
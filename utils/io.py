@@ -1,8 +1,23 @@
-# load_data(), fetch_and_cache(), license text
+# load_star_schema(), fetch_and_cache(), license text
+import gzip
+import hashlib
+import json
+import urllib.error
+import urllib.request
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_ds
+import pyarrow.ipc as pa_ipc
 import streamlit as st
 import os
-from utils.prep import clean_data
+import shutil
+import tempfile
+import threading
+import time
+from utils import prep
+from utils.prep import (clean_data, build_star_schema, duplicated_rows, nullity_profile, patch_clean_data,
+                        patch_star_schema)
 
 # -------------------------------------------------------------------
 # CONFIGURATION
@@ -10,39 +25,585 @@ from utils.prep import clean_data
 
 DATA_PATH = "data/delinquency.csv"   # adjust to your dataset name
 DATA_URL = "https://www.data.gouv.fr/datasets/bases-statistiques-communale-departementale-et-regionale-de-la-delinquance-enregistree-par-la-police-et-la-gendarmerie-nationales/#/resources/93438d99-b493-499c-b39f-7de46fa58669"
+DOWNLOAD_URL = "https://www.data.gouv.fr/fr/datasets/r/93438d99-b493-499c-b39f-7de46fa58669"   # latest release of the resource above (CSV, gzipped)
 LICENSE_TEXT = "DEP - Base statistique départementale de la délinquance enregistrée par la police et la gendarmerie nationales"
 LICENSE_SOURCE = "Data.gouv.fr - Licence Ouverte / Open Licence v2.0"
 
+# Explicit schema of the CSV: no type inference, codes stay strings ("2A", "971"),
+# and taux_pour_mille is parsed straight from its decimal-comma form.
+RAW_SCHEMA = {
+    "Code_departement": pa.string(),
+    "Code_region": pa.int16(),
+    "annee": pa.int16(),
+    "indicateur": pa.string(),
+    "unite_de_compte": pa.string(),
+    "nombre": pa.int32(),
+    "taux_pour_mille": pa.float64(),
+    "insee_pop": pa.int32(),
+    "insee_pop_millesime": pa.int16(),
+    "insee_log": pa.int32(),
+    "insee_log_millesime": pa.int16(),
+}
+
+# Opt-in compact in-memory representation (categoricals, downcast numbers)
+COMPACT_DATA = os.environ.get("DELINQUENCY_COMPACT", "0") == "1"
+
+# Precompute every regional deep dive in the background at startup
+WARM_UP = os.environ.get("DELINQUENCY_WARM_UP", "0") == "1"
+
+# Watch DATA_PATH and patch the loaded dataset when the file changes, every WATCH_INTERVAL seconds
+WATCH_DATA = os.environ.get("DELINQUENCY_WATCH", "0") == "1"
+WATCH_INTERVAL = float(os.environ.get("DELINQUENCY_WATCH_INTERVAL", "5"))
+
+# Map engine: "folium" (Leaflet, one DOM element per marker) or "pydeck" (WebGL, for many points)
+MAP_BACKEND = os.environ.get("DELINQUENCY_MAP_BACKEND", "folium")
+
+CACHE_DIR = "data/cache"              # columnar copies of the cleaned dataset
+CACHE_FORMAT_VERSION = "2"            # bump to invalidate every cached artifact
+
+FETCH_STATE_PATH = os.path.join(CACHE_DIR, "fetch-state.json")   # validators of the last download
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# Hive layout of the partitioned copy: <CACHE_DIR>/partitions-<fingerprint>/year=2016/Code_region=11/*.parquet
+PARTITION_SCHEMA = pa.schema([("year", pa.int16()), ("Code_region", pa.int16())])
+PARTITION_SORT = ["crime_type", "entity_involved"]   # tight row-group statistics for pushdown
+
 # -------------------------------------------------------------------
-# LOAD DATA FUNCTION
+# CSV INGESTION
 # -------------------------------------------------------------------
-@st.cache_data(show_spinner=False)
-def load_data() -> pd.DataFrame:
+def read_csv_typed(path=DATA_PATH, columns=None) -> pd.DataFrame:
     """
-    Load the raw delinquency dataset from local file.
-    Cached to avoid reloading on every app refresh.
+    Parse the delinquency CSV with the multithreaded Arrow reader and RAW_SCHEMA.
+    `columns` restricts parsing to the listed raw column names.
+    The UTF-8 BOM of the header is dropped by the reader.
     """
-    if os.path.exists(DATA_PATH):
-        data = pd.read_csv(DATA_PATH, sep=";"
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        parse_options=pa_csv.ParseOptions(delimiter=";"),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=RAW_SCHEMA,
+            decimal_point=",",
+            include_columns=columns,
+        ),
     )
-        new_data = clean_data(data)
+    return table.to_pandas()
+
+# -------------------------------------------------------------------
+# COLUMNAR CACHE
+# -------------------------------------------------------------------
+def _hash_file(path, digest, chunk_size=1 << 20):
+    """Feed the content of a file into a hashlib digest, chunk by chunk."""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest
+
+def data_fingerprint(path=DATA_PATH) -> str:
+    """
+    Fingerprint of the source CSV and of the code that reads and cleans it.
+    prep.py holds the cleaning steps and lookup tables and this module holds
+    RAW_SCHEMA, so an edit to either produces a new fingerprint.
+    """
+    digest = hashlib.sha256(CACHE_FORMAT_VERSION.encode())
+    _hash_file(path, digest)
+    _hash_file(prep.__file__, digest)
+    _hash_file(__file__, digest)
+    return digest.hexdigest()[:16]
+
+def _stamp(path):
+    """Cheap change marker of a file: its size and modification time."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _fingerprint_for(path, stamps) -> str:
+    """data_fingerprint, computed once per set of file stamps."""
+    return data_fingerprint(path)
+
+def _tag(fingerprint: str) -> str:
+    """Version token of a fingerprint: tagged with the in-memory representation."""
+    return f"{fingerprint}-compact" if COMPACT_DATA else fingerprint
+
+def dataset_version(path=DATA_PATH) -> str:
+    """
+    Version token of the dataset as loaded by this app: the data fingerprint,
+    tagged with the in-memory representation. Only re-hashes the files when
+    their size or modification time changed, so it is cheap to call per rerun.
+    With WATCH_DATA, the version published by the DataWatcher instead.
+    """
+    if WATCH_DATA:
+        return data_watcher().version
+    stamps = tuple(_stamp(p) for p in (path, prep.__file__, __file__))
+    return _tag(_fingerprint_for(path, stamps))
+
+def is_current(fingerprint: str, path=DATA_PATH) -> bool:
+    """
+    Whether a fingerprint is that of the CSV as it is now. A session can lag
+    behind an update (fetch_and_cache, DataWatcher): it must neither cache the
+    new rows under its old fingerprint nor sweep the new artifacts as stale.
+    """
+    return os.path.exists(path) and data_fingerprint(path) == fingerprint
+
+def cache_path(fingerprint: str) -> str:
+    """Location of the Arrow IPC artifact for a given fingerprint."""
+    return os.path.join(CACHE_DIR, f"delinquency-{fingerprint}.arrow")
+
+def read_cached_data(fingerprint: str):
+    """
+    Read the cleaned dataset back from the cache, or None on a miss.
+    The uncompressed Arrow file is memory-mapped and converted without copying
+    where the column types allow it, so its pages live in the OS page cache
+    and are shared by every server process reading the same artifact.
+    """
+    path = cache_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path) as source:
+            table = pa_ipc.open_file(source).read_all()
+        return table.to_pandas(split_blocks=True)
+    except Exception:
+        # Truncated or unreadable artifact: rebuild it from the CSV
+        return None
+
+def write_cached_data(data: pd.DataFrame, fingerprint: str):
+    """
+    Persist the cleaned dataset and, if `fingerprint` is current (see
+    is_current), drop artifacts of other fingerprints. The file is written
+    next to its final name then renamed, so a reader never sees a
+    half-written artifact. Failures only cost a rebuild.
+    """
+    path = cache_path(fingerprint)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        with pa_ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        for name in os.listdir(CACHE_DIR) if is_current(fingerprint) else []:
+            stale = os.path.join(CACHE_DIR, name)
+            if name.startswith("delinquency-") and name.endswith((".arrow", ".parquet")) and stale != path:
+                os.remove(stale)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+# -------------------------------------------------------------------
+# PARTITIONED STORAGE
+# -------------------------------------------------------------------
+def partition_dir(fingerprint: str) -> str:
+    """Location of the year/region partitioned copy for a given fingerprint."""
+    return os.path.join(CACHE_DIR, f"partitions-{fingerprint}")
+
+_partitions_lock = threading.Lock()
+
+def write_partitions(data: pd.DataFrame, fingerprint: str):
+    """
+    Persist the cleaned dataset as Parquet files partitioned by year and
+    region (Hive layout), each sorted by PARTITION_SORT, and drop the
+    partitions of other fingerprints if `fingerprint` is current. Written to
+    a temporary directory of its own then renamed, like write_cached_data.
+    Failures only cost a rebuild.
+    """
+    path = partition_dir(fingerprint)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix="tmp-partitions-", dir=CACHE_DIR)
+    try:
+        _write_partition_files(data, tmp_path)
+        os.replace(tmp_path, path)
+        for name in os.listdir(CACHE_DIR) if is_current(fingerprint) else []:
+            stale = os.path.join(CACHE_DIR, name)
+            if name.startswith("partitions-") and stale != path:
+                shutil.rmtree(stale, ignore_errors=True)
+    except (OSError, pa.ArrowException):
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def _write_partition_files(data: pd.DataFrame, path, basename_template=None):
+    """Write rows into the partition files of a directory, replacing partitions they land in."""
+    table = pa.Table.from_pandas(data.sort_values(PARTITION_SORT), preserve_index=False)
+    # Arrow refuses more than 1024 partitions per write by default: a long history goes past that
+    partitions = len(data[PARTITION_SCHEMA.names].drop_duplicates())
+    pa_ds.write_dataset(
+        table, path, format="parquet",
+        partitioning=pa_ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+        basename_template=basename_template,
+        existing_data_behavior="delete_matching",
+        max_partitions=max(partitions, 1024),
+    )
+
+def move_partitions(previous: str, fingerprint: str, update):
+    """
+    Carry the partitioned copy of fingerprint `previous` over to `fingerprint`,
+    calling update(directory) on it in a temporary directory first, so the
+    new copy never shows up half-updated. Does nothing if there is no copy
+    to carry over or the new one exists already.
+    """
+    old_path, path = partition_dir(previous), partition_dir(fingerprint)
+    with _partitions_lock:
+        if not os.path.exists(old_path) or os.path.exists(path):
+            return
+        tmp_path = tempfile.mkdtemp(prefix="tmp-partitions-", dir=CACHE_DIR)
+        try:
+            os.replace(old_path, tmp_path)
+            update(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+def read_partitions(version: str, years=None, regions=None, crime_type=None, entity=None, columns=None) -> pd.DataFrame:
+    """
+    Read only the cleaned rows a page asks for from the partitioned copy of a
+    dataset version (built on first use). `years` is a (first, last) range
+    and `regions` a list of region codes: partitions outside them are never
+    opened. `crime_type` and `entity` are pushed down to the Parquet row groups.
+    """
+    fingerprint = version.removesuffix("-compact")
+    path = partition_dir(fingerprint)
+    if not os.path.exists(path):
+        # Sessions are threads of one process: only one of them builds the copy
+        with _partitions_lock:
+            if not os.path.exists(path):
+                # Only from rows of that fingerprint: its Arrow cache, or the CSV if still current
+                data = read_cached_data(fingerprint)
+                if data is None and is_current(fingerprint):
+                    data = read_clean_data(fingerprint)
+                if data is not None:
+                    write_partitions(data, fingerprint)
+    if os.path.exists(path):
+        dataset = pa_ds.dataset(path, format="parquet", partitioning=pa_ds.partitioning(PARTITION_SCHEMA, flavor="hive"))
     else:
-        st.error("❌ Dataset not found. Please place it in the /data folder.")
-        return pd.DataFrame()
+        # The copy could not be written, or the CSV has moved on: filter the cleaned dataset instead
+        dataset = pa_ds.dataset(pa.Table.from_pandas(read_clean_data(fingerprint), preserve_index=False))
+
+    conditions = []
+    if years is not None:
+        conditions += [pa_ds.field("year") >= years[0], pa_ds.field("year") <= years[1]]
+    if regions is not None:
+        conditions.append(pa_ds.field("Code_region").isin(list(regions)))
+    if crime_type is not None:
+        conditions.append(pa_ds.field("crime_type") == crime_type)
+    if entity is not None:
+        conditions.append(pa_ds.field("entity_involved") == entity)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+def read_selection(version: str, selection, regions=None, columns=None) -> pd.DataFrame:
+    """read_partitions for a filter selection (entity, (first_year, last_year), crime_type); 'All' is no filter."""
+    entity, years, crime = selection
+    return read_partitions(
+        version, years=years, regions=regions,
+        crime_type=None if crime == "All" else crime,
+        entity=None if entity == "All" else entity,
+        columns=columns,
+    )
+
+# -------------------------------------------------------------------
+# INCREMENTAL FETCH
+# -------------------------------------------------------------------
+def _read_fetch_state() -> dict:
+    """Validators of the last downloads, per (url, local CSV) key; empty if unknown."""
+    try:
+        with open(FETCH_STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _fetch_key(url, target) -> str:
+    return f"{url} -> {os.path.abspath(target)}"
+
+def _save_validators(url, target, validators: dict):
+    """Remember the ETag / Last-Modified of the release `target` was updated from."""
+    state = _read_fetch_state()
+    state[_fetch_key(url, target)] = validators
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(FETCH_STATE_PATH, "w") as f:
+        json.dump(state, f)
+
+def download_release(url, path, target=DATA_PATH, timeout=60):
+    """
+    Conditional GET of a release into `path`, streamed in chunks.
+    Sends the validators of the release the local CSV `target` was last
+    updated from (if it still exists) and returns the new ones, or None
+    when the server answers 304 Not Modified (nothing is written).
+    """
+    validators = _read_fetch_state().get(_fetch_key(url, target), {})
+    headers = {"User-Agent": "delinquency-dashboard"}
+    if os.path.exists(target):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return None
+        raise
+    with response, open(path, "wb") as f:
+        shutil.copyfileobj(response, f, DOWNLOAD_CHUNK_SIZE)
+    return {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+def _open_release(path):
+    """Text stream of a downloaded release, gunzipped on the fly if needed."""
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    opener = gzip.open if gzipped else open
+    return opener(path, "rt", encoding="utf-8-sig", newline="")
+
+def _columns(header) -> list:
+    """Column names of a CSV header line."""
+    return [name.strip('"') for name in header.rstrip("\r\n").split(";")]
+
+def _replace_with_release(release_path, path) -> list:
+    """Take a release over as the local CSV, as a whole; return its years."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with _open_release(release_path) as source, open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        shutil.copyfileobj(source, f, DOWNLOAD_CHUNK_SIZE)
+    os.replace(tmp_path, path)
+    return sorted(read_csv_typed(path, columns=["annee"])["annee"].unique().tolist())
+
+def _split_new_years(release_path, rows_path, known_years) -> list:
+    """
+    Copy the lines of a release whose year is not in `known_years` to
+    `rows_path` (header included), unchanged, and return those years.
+    Blank lines are skipped. Lines are streamed: the release is never held
+    in memory.
+    """
+    new_years = set()
+    with _open_release(release_path) as source, open(rows_path, "w", encoding="utf-8", newline="") as rows:
+        header = source.readline()
+        year_field = _columns(header).index("annee")
+        rows.write(header)
+        for line in source:
+            if not line.strip():
+                continue
+            year = int(line.split(";", year_field + 1)[year_field].strip('"'))
+            if year not in known_years:
+                new_years.add(year)
+                rows.write(line)
+    return sorted(new_years)
+
+def _append_to_store(new_rows: pd.DataFrame, previous: str, fingerprint: str):
+    """
+    Carry the cleaned artifacts of fingerprint `previous` over to `fingerprint`
+    with the cleaned `new_rows` appended, instead of rebuilding them from the
+    whole CSV. Rows of a new year cannot duplicate older ones, so this gives
+    the same frame as cleaning the whole file. Missing artifacts are left to
+    the usual rebuild on first load.
+    """
+    cleaned = read_cached_data(previous)
+    if cleaned is not None:
+        write_cached_data(pd.concat([cleaned, new_rows], ignore_index=True), fingerprint)
+    move_partitions(previous, fingerprint, lambda path: _write_partition_files(
+        new_rows, path, basename_template=f"{fingerprint}-{{i}}.parquet"))
+
+def fetch_and_cache(url=DOWNLOAD_URL, path=DATA_PATH, timeout=60) -> list:
+    """
+    Bring the local CSV up to date with the latest release and return the
+    years that were added (empty when the release did not change).
+
+    The release is fetched with a conditional request and streamed to disk.
+    Only the rows of years missing from the local CSV are appended to it
+    and to the cleaned cache. Revisions of years already held are ignored:
+    delete the CSV to take a release over as a whole. A release whose
+    columns differ from the local CSV replaces it as a whole (and every year
+    is returned). The app picks up the new data on the next rerun (see
+    dataset_version).
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    release_path = os.path.join(CACHE_DIR, f"release.{os.getpid()}.tmp")
+    rows_path = f"{release_path}.rows"
+    try:
+        validators = download_release(url, release_path, target=path, timeout=timeout)
+        if validators is None:
+            return []
+        if os.path.exists(path):
+            with open(path, encoding="utf-8-sig", newline="") as local, _open_release(release_path) as release:
+                same_columns = _columns(local.readline()) == _columns(release.readline())
+        if not os.path.exists(path) or not same_columns:
+            # Lines can only be appended under the same columns
+            years = _replace_with_release(release_path, path)
+            _save_validators(url, path, validators)
+            return years
+
+        known_years = set(read_csv_typed(path, columns=["annee"])["annee"].unique().tolist())
+        new_years = _split_new_years(release_path, rows_path, known_years)
+        if new_years:
+            previous = data_fingerprint(path)
+            new_rows = clean_data(read_csv_typed(rows_path))
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+            with open(rows_path, encoding="utf-8", newline="") as rows, open(path, "a", encoding="utf-8", newline="") as f:
+                rows.readline()
+                if needs_newline:
+                    f.write("\n")
+                shutil.copyfileobj(rows, f, DOWNLOAD_CHUNK_SIZE)
+            _append_to_store(new_rows, previous, data_fingerprint(path))
+        _save_validators(url, path, validators)
+        return new_years
+    finally:
+        for tmp in (release_path, rows_path):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+# -------------------------------------------------------------------
+# LOAD DATA FUNCTION
+# -------------------------------------------------------------------
+def read_clean_data(fingerprint=None) -> pd.DataFrame:
+    """
+    Read the cleaned dataset from the Arrow cache, rebuilding it from the
+    CSV on a miss. The rebuild is only cached if the CSV still has that
+    fingerprint (see is_current). Not cached in memory: see load_star_schema.
+    """
+    fingerprint = fingerprint or data_fingerprint()
+    new_data = read_cached_data(fingerprint)
+    if new_data is None:
+        data = read_csv_typed(DATA_PATH)
+        new_data = clean_data(data)
+        if is_current(fingerprint):
+            write_cached_data(new_data, fingerprint)
     return new_data
 
-def load_raw_data() -> pd.DataFrame:
+# Schemas patched by the DataWatcher, picked up by _load_star_schema
+_patched_schemas = {}
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_star_schema(version: str):
+    """Build the StarSchema of a dataset version, once per process."""
+    if version in _patched_schemas:
+        return _patched_schemas.pop(version)
+    fingerprint = version.removesuffix("-compact")
+    return build_star_schema(read_clean_data(fingerprint), compact=COMPACT_DATA, version=version)
+
+def load_star_schema():
     """
-    Load the raw delinquency dataset from local file without caching.
-    Useful for debugging or when data changes frequently.
+    Load the cleaned dataset as a StarSchema (fact table plus dimensions).
+    This is what the dashboard pages work on; returns None if the dataset is missing.
+    Tables are compacted when DELINQUENCY_COMPACT=1 is set in the environment.
+    The schema is cached by its version token (see dataset_version) and shared
+    as-is by every session and rerun: no per-call copy, no DataFrame hashing.
+    Treat it as read-only.
     """
-    if os.path.exists(DATA_PATH):
-        data = pd.read_csv(DATA_PATH, sep=";")
-    else:
+    if not os.path.exists(DATA_PATH):
+        st.error("❌ Dataset not found. Please place it in the /data folder.")
+        return None
+    return _load_star_schema(dataset_version())
+
+# -------------------------------------------------------------------
+# HOT RELOAD
+# -------------------------------------------------------------------
+def _patch_partitions(previous: str, fingerprint: str, data: pd.DataFrame, changed: pd.DataFrame):
+    """Move the partitioned copy to a new fingerprint, rewriting only the (year, region) partitions of changed rows."""
+    def rewrite(path):
+        for year, region in changed[["year", "Code_region"]].drop_duplicates().itertuples(index=False):
+            shutil.rmtree(os.path.join(path, f"year={year}", f"Code_region={region}"), ignore_errors=True)
+            rows = data[(data["year"] == year) & (data["Code_region"] == region)]
+            if len(rows):
+                _write_partition_files(rows, path, basename_template=f"{fingerprint}-{{i}}.parquet")
+    move_partitions(previous, fingerprint, rewrite)
+
+def patch_dataset(previous: str, fingerprint: str, path=DATA_PATH) -> bool:
+    """
+    Carry the cleaned dataset, its partitioned copy and the loaded StarSchema
+    of fingerprint `previous` over to `fingerprint` by diffing the rows of
+    the CSV (see prep.patch_clean_data). Only the changed rows are cleaned
+    and only the cube groups they touch are re-aggregated.
+    Returns False when the previous artifacts are missing or rows cannot be
+    matched; the new version is then built from scratch on first load.
+    """
+    cleaned = read_cached_data(previous)
+    if cleaned is None:
+        return False
+    try:
+        data, changed = patch_clean_data(cleaned, read_csv_typed(path))
+    except ValueError:
+        return False
+    write_cached_data(data, fingerprint)
+    _patch_partitions(previous, fingerprint, data, changed)
+    schema = patch_star_schema(_load_star_schema(_tag(previous)), data, changed, compact=COMPACT_DATA, version=_tag(fingerprint))
+    _patched_schemas.clear()
+    _patched_schemas[_tag(fingerprint)] = schema
+    return True
+
+class DataWatcher:
+    """
+    Polls DATA_PATH from a daemon thread and publishes a new dataset version
+    once a change has settled (same size and mtime on two polls in a row).
+    The new version is prepared with patch_dataset before it is published,
+    so sessions keep using the previous one until then.
+    """
+    def __init__(self, path=DATA_PATH, interval=WATCH_INTERVAL):
+        self.path, self.interval = path, interval
+        self.stamp = self.pending = _stamp(path)
+        self.version = _tag(data_fingerprint(path))
+        self.error = None
+        threading.Thread(target=self._run, name="delinquency-watcher", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as error:
+                # Keep serving the current version; the next change retries
+                self.error = error
+
+    def check(self):
+        """Publish a new version if the file changed since the last poll and is now stable."""
+        stamp = _stamp(self.path) if os.path.exists(self.path) else None
+        if stamp is None or stamp == self.stamp or stamp != self.pending:
+            self.pending = stamp
+            return
+        previous, fingerprint = self.version.removesuffix("-compact"), data_fingerprint(self.path)
+        if fingerprint != previous:
+            patch_dataset(previous, fingerprint, self.path)
+            self.version = _tag(fingerprint)
+        self.stamp, self.error = stamp, None
+
+@st.cache_resource(show_spinner=False)
+def data_watcher() -> DataWatcher:
+    """The DataWatcher of DATA_PATH, started once per process."""
+    return DataWatcher()
+
+# Raw columns the nullity profile is broken down by
+PROFILE_GROUPS = {"year": "annee", "department": "Code_departement"}
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _raw_profile(version: str) -> dict:
+    """Profile of the raw CSV of a dataset version (see load_raw_profile)."""
+    data = read_csv_typed(DATA_PATH)
+    return {
+        "head": data.head(),
+        "nullity": nullity_profile(data, PROFILE_GROUPS),
+        "duplicates": data[duplicated_rows(data)],
+    }
+
+def load_raw_profile():
+    """
+    Summary of the raw dataset for the Technical page, computed once per
+    dataset version: its first rows ('head'), null counts per column, year
+    and department ('nullity', see prep.nullity_profile) and its duplicated
+    rows ('duplicates'). Returns None if the dataset is missing.
+    """
+    if not os.path.exists(DATA_PATH):
         st.error("❌ Dataset not found. Please place it in the /data folder.")
-        return pd.DataFrame()
-    
-    return data
+        return None
+    return _raw_profile(dataset_version())
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _raw_sample(version: str, size: int) -> pd.DataFrame:
+    """Random sample of the raw CSV of a dataset version (see load_raw_sample)."""
+    data = read_csv_typed(DATA_PATH)
+    return data.sample(min(size, len(data)), random_state=0).sort_index()
+
+def load_raw_sample(size: int) -> pd.DataFrame:
+    """A reproducible random sample of `size` raw rows, in file order."""
+    return _raw_sample(dataset_version(), size)
 
 
 # -------------------------------------------------------------------
@@ -56,4 +617,11 @@ def show_license():
     st.sidebar.caption("LICENSE / DATA SOURCE")
     st.sidebar.caption(LICENSE_TEXT)
     st.sidebar.caption(LICENSE_SOURCE)
-    st.sidebar.link_button("Go to data source", DATA_URL, type="secondary")
\ No newline at end of file
+    st.sidebar.link_button("Go to data source", DATA_URL, type="secondary")
+
+
+if __name__ == "__main__":
+    # python -m utils.io [url]: fetch the latest release and append its new years
+    import sys
+    added = fetch_and_cache(*sys.argv[1:2])
+    print(f"Added years: {', '.join(map(str, added))}" if added else "Dataset already up to date")
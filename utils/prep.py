@@ -1,4 +1,6 @@
 # cleaning, normalization, feature engineering
+from dataclasses import dataclass
+from types import MappingProxyType
 import pandas as pd
 import numpy as np
 
@@ -135,69 +137,77 @@ DEPARTMENT_COORDINATES = {
 }
 
 # --------------------------------------------------------------
-# Cleaning functions
+# Dimension tables
 # --------------------------------------------------------------
-def rename_columns(data):
+COLUMN_NAMES = {
+    'Code_region': 'Code_region',
+    'Code_departement': 'Code_department',
+    'annee': 'year',
+    'indicateur': 'crime_type',
+    'unite_de_compte': 'entity_involved',
+    'nombre': 'amount',
+    'taux_pour_mille': 'rate_per_1000',
+    'insee_pop': 'population',
+    'insee_pop_millesime': 'population_year',
+    'insee_log': 'housing',
+    'insee_log_millesime': 'housing_year',
+}
+
+def build_dimension(coordinates, prefix) -> pd.DataFrame:
     """
-    Rename columns to English for consistency.
+    Turn a coordinates dictionary into a lookup table indexed by code,
+    with '<prefix>_name', '<prefix>_lat' and '<prefix>_lon' columns.
     """
-    data_copy = data.copy()
-    data_copy = data_copy.rename(columns={
-        'Code_region': 'Code_region',
-        'Code_departement': 'Code_department',
-        'annee': 'year',
-        'indicateur': 'crime_type',
-        'unite_de_compte': 'entity_involved',
-        'nombre': 'amount',
-        'taux_pour_mille': 'rate_per_1000',
-        'insee_pop': 'population',
-        'insee_pop_millesime': 'population_year',
-        'insee_log': 'housing',
-        'insee_log_millesime': 'housing_year',
-    })
-    return data_copy
+    table = pd.DataFrame.from_dict(coordinates, orient="index")[["name", "lat", "lon"]]
+    table.columns = [f"{prefix}_name", f"{prefix}_lat", f"{prefix}_lon"]
+    return table
 
-def convert_rate_to_numeric(data):
+DEPARTMENTS = build_dimension(DEPARTMENT_COORDINATES, "Department")
+REGIONS = build_dimension(REGION_COORDINATES, "Region")
+
+def join_dimension(data, dimension, key):
     """
-    Convert 'rate_per_1000' column from French format (comma decimal) to numeric float.
+    Add the columns of a dimension table to data, in place.
+    All rows are looked up at once; unknown codes get NaN coordinates
+    and an 'Unknown' name.
     """
-    data_copy = data.copy()
-    data_copy['rate_per_1000'] = data_copy['rate_per_1000'].str.replace(',', '.').astype(float)
-    return data_copy
+    looked_up = dimension.reindex(data[key].to_numpy())
+    for column in dimension.columns:
+        values = looked_up[column]
+        if column.endswith("_name"):
+            values = values.fillna("Unknown")
+        data[column] = values.to_numpy()
+    return data
 
-def add_region_names(data):
+# --------------------------------------------------------------
+# Cleaning functions
+# --------------------------------------------------------------
+def rename_columns(data):
     """
-    Add region names using the REGIONS dictionary.
+    Rename columns to English for consistency.
     """
-    data_copy = data.copy()
-    data_copy['Region_name'] = data_copy['Code_region'].map(lambda x: REGION_COORDINATES.get(x, {}).get("name", "Unknown"))
-    return data_copy
+    return data.rename(columns=COLUMN_NAMES)
 
-def add_region_coordinates(data):
+def convert_rate_to_numeric(data):
     """
-    Add region coordinates using the REGION_COORDINATES dictionary.
+    Convert 'rate_per_1000' column from French format (comma decimal) to numeric float, in place.
+    Frames read with io.read_csv_typed are already parsed and left untouched.
     """
-    data_copy = data.copy()
-    data_copy['Region_lat'] = data_copy['Code_region'].map(lambda x: REGION_COORDINATES.get(x, {"lat": None})['lat'])
-    data_copy['Region_lon'] = data_copy['Code_region'].map(lambda x: REGION_COORDINATES.get(x, {"lon": None})['lon'])
-    return data_copy
+    if not pd.api.types.is_numeric_dtype(data['rate_per_1000']):
+        data['rate_per_1000'] = data['rate_per_1000'].str.replace(',', '.', regex=False).astype(float)
+    return data
 
-def add_department_names(data):
+def add_department_columns(data):
     """
-    Add department names using the DEPARTMENT_COORDINATES dictionary.
+    Add department names and coordinates using the DEPARTMENTS table, in place.
     """
-    data_copy = data.copy()
-    data_copy['Department_name'] = data_copy['Code_department'].map(lambda x: DEPARTMENT_COORDINATES.get(x, {}).get("name", "Unknown"))
-    return data_copy
+    return join_dimension(data, DEPARTMENTS, 'Code_department')
 
-def add_department_coordinates(data):
+def add_region_columns(data):
     """
-    Add department coordinates using the DEPARTMENT_COORDINATES dictionary.
+    Add region names and coordinates using the REGIONS table, in place.
     """
-    data_copy = data.copy()
-    data_copy['Department_lat'] = data_copy['Code_department'].map(lambda x: DEPARTMENT_COORDINATES.get(x, {"lat": None})['lat'])
-    data_copy['Department_lon'] = data_copy['Code_department'].map(lambda x: DEPARTMENT_COORDINATES.get(x, {"lon": None})['lon'])
-    return data_copy    
+    return join_dimension(data, REGIONS, 'Code_region')
 
 def check_missing_data(data):
     """
@@ -207,28 +217,499 @@ def check_missing_data(data):
     missing.columns = ['column', 'missing_fraction']
     return missing.sort_values('missing_fraction', ascending=False)
 
+def nullity_profile(data, groups) -> dict:
+    """
+    Null counts of the columns of data, in one pass over its null mask:
+    - 'rows': number of rows
+    - 'columns': null count per column
+    - one frame per name of `groups` ({name: column}): null counts per value
+      of that column, with its number of rows in a 'rows' column; rows with
+      a null value of that column are counted under a null key
+    """
+    nulls = data.isna()
+    profile = {'rows': len(data), 'columns': nulls.sum()}
+    counted = nulls.assign(rows=1)
+    for name, column in groups.items():
+        profile[name] = counted.groupby(data[column], observed=True, dropna=False).sum()
+    return profile
+
+# Set by clean_data: hash of the raw columns of each row
+RAW_COLUMNS = list(COLUMN_NAMES.values())
+ROW_FINGERPRINT = 'row_fingerprint'
+
+def row_hashes(frame, columns) -> pd.Index:
+    """
+    64-bit hash of the values of `columns` in every row of a frame.
+    String columns are hashed once per distinct value, through categoricals.
+    """
+    frame = frame[columns]
+    strings = {column: 'category' for column in columns if pd.api.types.is_string_dtype(frame[column])}
+    return pd.Index(pd.util.hash_pandas_object(frame.astype(strings), index=False).to_numpy())
+
+def row_fingerprints(data) -> pd.Index:
+    """
+    Fingerprint of every row: its ROW_FINGERPRINT column when it has one,
+    else a hash of all its columns.
+    """
+    if ROW_FINGERPRINT in data.columns:
+        return pd.Index(data[ROW_FINGERPRINT].to_numpy())
+    return row_hashes(data, list(data.columns))
+
+def duplicated_rows(data) -> np.ndarray:
+    """Mask of the rows repeating an earlier row, compared on their fingerprints."""
+    return row_fingerprints(data).duplicated()
+
 def check_duplicates(data):
     """
     Check for duplicate rows in the dataset.
     """
-    return data.duplicated().sum()
+    return int(duplicated_rows(data).sum())
+
 def clean_data(data):
     """
     Main function to clean and prepare the delinquency data.
+    The renamed frame is the only copy made: every later step works on it
+    in place, and the lookups are vectorized joins on the dimension tables.
     """
-    # Convert taux_pour_mille to numeric
     data_cleaned = rename_columns(data)
-    data_cleaned = convert_rate_to_numeric(data_cleaned)
-    
-    if check_duplicates(data_cleaned) > 0:
-        data_cleaned = data_cleaned.drop_duplicates().reset_index(drop=True)    
-    
-    # Add department names
-    data_cleaned = add_department_names(data_cleaned)
-    data_cleaned = add_department_coordinates(data_cleaned)
-    # Add region names
-    data_cleaned = add_region_names(data_cleaned)
-    data_cleaned = add_region_coordinates(data_cleaned)
+    # Convert taux_pour_mille to numeric
+    convert_rate_to_numeric(data_cleaned)
+
+    # Hashed once here; later duplicate checks on any subset reuse it
+    data_cleaned[ROW_FINGERPRINT] = row_hashes(data_cleaned, RAW_COLUMNS).to_numpy()
+    duplicated = duplicated_rows(data_cleaned)
+    if duplicated.any():
+        data_cleaned = data_cleaned[~duplicated].reset_index(drop=True)
+
+    # Add department and region names and coordinates
+    add_department_columns(data_cleaned)
+    add_region_columns(data_cleaned)
 
     # Feature engineering
     return data_cleaned
+
+# --------------------------------------------------------------
+# Star schema
+# --------------------------------------------------------------
+FACT_COLUMNS = ['Code_department', 'year', 'crime_type', 'entity_involved', 'amount', 'rate_per_1000']
+POPULATION_COLUMNS = ['population', 'population_year', 'housing', 'housing_year']
+
+@dataclass(frozen=True)
+class StarSchema:
+    """
+    Cleaned dataset split into a slim fact table and its dimension tables.
+    - facts: one row per (Code_department, year, crime_type, entity_involved)
+    - departments: indexed by Code_department (Code_region, name, coordinates)
+    - regions: indexed by Code_region (name, coordinates)
+    - population: indexed by (Code_department, year) (INSEE population/housing and vintages)
+    - cube: pre-aggregated measures per level, see build_cube
+    - indexes: row positions per dimension value for the facts and each cube level, see build_row_index
+    - version: token identifying the source data and representation, used as a cache key
+    The schema is shared by every session. Its tables are handed out as
+    shallow copies of read-only frames (see read_only_frame): an in-place
+    write either raises or, through copy-on-write, only changes the copy.
+    """
+    _facts: pd.DataFrame
+    _departments: pd.DataFrame
+    _regions: pd.DataFrame
+    _population: pd.DataFrame
+    _cube: dict
+    indexes: dict
+    version: str = ''
+
+    @property
+    def facts(self) -> pd.DataFrame:
+        return self._facts.copy(deep=False)
+
+    @property
+    def departments(self) -> pd.DataFrame:
+        return self._departments.copy(deep=False)
+
+    @property
+    def regions(self) -> pd.DataFrame:
+        return self._regions.copy(deep=False)
+
+    @property
+    def population(self) -> pd.DataFrame:
+        return self._population.copy(deep=False)
+
+    @property
+    def cube(self):
+        return MappingProxyType({level: frame.copy(deep=False) for level, frame in self._cube.items()})
+
+    def table(self, name) -> pd.DataFrame:
+        """The fact table ('facts') or a cube level ('department', 'region', 'national')."""
+        return self.facts if name == 'facts' else self._cube[name].copy(deep=False)
+
+def build_star_schema(data, compact=False, version='') -> StarSchema:
+    """
+    Split the cleaned dataset (see clean_data) into a StarSchema and
+    materialize its cube. With compact=True the fact and population tables
+    are compacted first (see compact_frame). `version` should change
+    whenever the data does (see utils.io.data_fingerprint).
+    """
+    facts, departments, regions, population = split_tables(data, compact)
+    cube = build_cube(facts, departments, population)
+    return freeze_schema(facts, departments, regions, population, cube, version)
+
+def split_tables(data, compact=False):
+    """The fact, departments, regions and population tables of the cleaned dataset."""
+    facts = data[FACT_COLUMNS].reset_index(drop=True)
+
+    departments = data[['Code_department', 'Code_region']].drop_duplicates('Code_department')
+    departments = add_department_columns(departments).set_index('Code_department').sort_index()
+
+    regions = pd.DataFrame({'Code_region': np.sort(departments['Code_region'].unique())})
+    regions = add_region_columns(regions).set_index('Code_region')
+
+    population = (data[['Code_department', 'year'] + POPULATION_COLUMNS]
+                  .drop_duplicates(['Code_department', 'year'])
+                  .set_index(['Code_department', 'year'])
+                  .sort_index())
+
+    if compact:
+        # Department codes share the categories of the departments table
+        facts = compact_frame(facts, {'Code_department': departments.index.to_numpy()})
+        population = compact_frame(population)
+    return facts, departments, regions, population
+
+def freeze_schema(facts, departments, regions, population, cube, version='') -> StarSchema:
+    """Index the tables and cube levels and wrap them, read-only, in a StarSchema."""
+    indexes = {name: build_row_index(frame) for name, frame in [('facts', facts), *cube.items()]}
+
+    # The schema is shared by every session: guard it against in-place writes
+    facts, departments, regions, population = map(read_only_frame, [facts, departments, regions, population])
+    cube = {level: read_only_frame(frame) for level, frame in cube.items()}
+    indexes = MappingProxyType({name: read_only_index(index) for name, index in indexes.items()})
+    return StarSchema(facts, departments, regions, population, cube, indexes, version)
+
+def attach_departments(aggregate, schema):
+    """
+    Join department attributes (Code_region, name, coordinates) onto an
+    aggregate that has a 'Code_department' column.
+    """
+    return aggregate.join(schema.departments, on='Code_department')
+
+def attach_regions(aggregate, schema):
+    """
+    Join region attributes (name, coordinates) onto an aggregate that has a 'Code_region' column.
+    """
+    return aggregate.join(schema.regions, on='Code_region')
+
+def attach_population(aggregate, schema):
+    """
+    Join INSEE population and housing onto an aggregate that has
+    'Code_department' and 'year' columns.
+    """
+    return aggregate.join(schema.population, on=['Code_department', 'year'])
+
+# --------------------------------------------------------------
+# OLAP cube
+# --------------------------------------------------------------
+CUBE_DIMENSIONS = ['year', 'crime_type', 'entity_involved']
+CUBE_MEASURES = {'amount': 'sum', 'records': 'sum', 'rate_sum': 'sum', 'population': 'sum'}
+CUBE_KEYS = {
+    'department': ['Code_department', 'Code_region'] + CUBE_DIMENSIONS,
+    'region': ['Code_region'] + CUBE_DIMENSIONS,
+    'national': CUBE_DIMENSIONS,
+}
+
+def build_cube(facts, departments, population) -> dict:
+    """
+    Pre-aggregate the facts over year x crime_type x entity_involved at three levels:
+    - 'department': per Code_department (with its Code_region)
+    - 'region': per Code_region
+    - 'national': whole dataset
+    Measures are the total amount, the number of fact records, the sum of
+    rate_per_1000 (mean rate = rate_sum / records) and the summed INSEE
+    population of the departments involved.
+    Each level is rolled up from the one below, and rows keep the order in
+    which their keys first appear in the facts.
+    """
+    department = aggregate_level(cube_base(facts, departments, population), 'department')
+    region = aggregate_level(department, 'region')
+    national = aggregate_level(region, 'national')
+    return {'department': department, 'region': region, 'national': national}
+
+def cube_base(facts, departments, population) -> pd.DataFrame:
+    """Fact rows with their Code_region and the per-row cube measures."""
+    base = facts[['Code_department'] + CUBE_DIMENSIONS].assign(
+        Code_region=departments['Code_region'].reindex(facts['Code_department']).to_numpy(),
+        amount=facts['amount'].astype(np.int64),
+        records=1,
+        rate_sum=facts['rate_per_1000'].astype(np.float64),
+    )
+    return base.join(population['population'].astype(np.int64), on=['Code_department', 'year'])
+
+def aggregate_level(rows, level) -> pd.DataFrame:
+    """Sum the cube measures of rows (cube base or a lower level) over the keys of a cube level."""
+    return rows.groupby(CUBE_KEYS[level], observed=True, sort=False).agg(CUBE_MEASURES).reset_index()
+
+ROLLUP_MEASURES = ['records', 'amount', 'rate_per_1000']
+
+def rollup(level, by, measures=ROLLUP_MEASURES) -> pd.DataFrame:
+    """
+    Roll cube rows (any level) up to the `by` columns in a single groupby pass
+    and return the requested measures for every group, sorted by `by`:
+    - 'records': number of fact records
+    - 'amount': total amount
+    - 'rate_per_1000': mean rate (rate_sum / records)
+    - 'population': summed population
+    """
+    sums = [m for m in CUBE_MEASURES if m in measures]
+    if 'rate_per_1000' in measures:
+        sums = list(dict.fromkeys(sums + ['records', 'rate_sum']))
+    result = level.groupby(by, observed=True)[sums].sum().reset_index()
+    if 'rate_per_1000' in measures:
+        result['rate_per_1000'] = result['rate_sum'] / result['records']
+    return result[list(by) + list(measures)]
+
+NATIONAL_SCOPE = 'France'
+
+def build_baseline(schema) -> dict:
+    """
+    Region and national KPIs, computed once from the department level of the cube:
+    - 'yearly': indexed by (Region_name, year)
+    - 'overall': indexed by Region_name, all years together
+    Both have a NATIONAL_SCOPE row (per year) for France as a whole, and the
+    columns records, amount, rate_sum, rate_per_1000, departments (number
+    reported) and population. Overall population is that of the latest year.
+    """
+    names = schema.regions['Region_name']
+    department = schema.cube['department']
+    department = department.assign(Region_name=names.reindex(department['Code_region']).to_numpy())
+    population = schema.population[['population']].astype(np.int64).reset_index()
+    region_codes = schema.departments['Code_region'].reindex(population['Code_department'])
+    population['Region_name'] = names.reindex(region_codes).to_numpy()
+
+    def per_scope(frame, by, **aggregations):
+        """Aggregate per region, then for the whole country, over `by`."""
+        regional = frame.groupby(['Region_name'] + by, observed=True).agg(**aggregations)
+        national = frame.assign(Region_name=NATIONAL_SCOPE).groupby(['Region_name'] + by, observed=True).agg(**aggregations)
+        return pd.concat([regional, national])
+
+    measures = {'records': ('records', 'sum'), 'amount': ('amount', 'sum'),
+                'rate_sum': ('rate_sum', 'sum'), 'departments': ('Code_department', 'nunique')}
+    yearly = per_scope(department, ['year'], **measures)
+    yearly['population'] = per_scope(population, ['year'], population=('population', 'sum'))['population']
+    overall = per_scope(department, [], **measures)
+    latest_year = department['year'].max()
+    overall['population'] = yearly['population'].xs(latest_year, level='year')
+
+    for frame in (yearly, overall):
+        frame['rate_per_1000'] = frame['rate_sum'] / frame['records']
+    return {'yearly': yearly, 'overall': overall}
+
+# --------------------------------------------------------------
+# Row indexes
+# --------------------------------------------------------------
+INDEX_DIMENSIONS = ['entity_involved', 'year', 'crime_type', 'Code_region', 'Code_department']
+NO_ROWS = np.empty(0, dtype=np.int32)
+
+def build_row_index(frame, dimensions=INDEX_DIMENSIONS) -> dict:
+    """
+    For each dimension present in the frame, map every value to the sorted
+    positions of the rows holding it: {dimension: {value: positions}}.
+    """
+    index = {}
+    for dimension in dimensions:
+        if dimension not in frame.columns:
+            continue
+        codes, uniques = pd.factorize(frame[dimension])
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        index[dimension] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques.tolist())}
+    return index
+
+def select_positions(index, selection):
+    """
+    Row positions matching a filter selection (entity, (first_year, last_year), crime_type),
+    found by intersecting the positions of the selected values.
+    'All' leaves a dimension unfiltered; returns None when nothing is filtered out.
+    """
+    entity, (first_year, last_year), crime = selection
+    parts = []
+    if entity != 'All':
+        parts.append(index['entity_involved'].get(entity, NO_ROWS))
+    years = [positions for year, positions in index['year'].items() if first_year <= year <= last_year]
+    if len(years) < len(index['year']):
+        parts.append(np.sort(np.concatenate(years)) if years else NO_ROWS)
+    if crime != 'All':
+        parts.append(index['crime_type'].get(crime, NO_ROWS))
+    return intersect_positions(parts)
+
+def intersect_positions(parts):
+    """Intersect sorted position arrays, smallest first; None when there is nothing to intersect."""
+    if not parts:
+        return None
+    parts = sorted(parts, key=len)
+    positions = parts[0]
+    for other in parts[1:]:
+        positions = np.intersect1d(positions, other, assume_unique=True)
+    return positions
+
+# --------------------------------------------------------------
+# Incremental updates
+# --------------------------------------------------------------
+# A raw row is identified by (department, year, indicator, unit)
+ROW_KEY = ['Code_department', 'year', 'crime_type', 'entity_involved']
+
+def patch_clean_data(cleaned, raw):
+    """
+    clean_data(raw), from `cleaned` = clean_data of an earlier version of
+    the raw rows. Rows are matched on ROW_KEY and compared by a hash of
+    their raw columns: unchanged rows are carried over and only inserted
+    or updated rows go through clean_data.
+    Returns the cleaned frame and the ROW_KEY and Code_region of every
+    deleted, updated (old and new values) or inserted row.
+    Raises ValueError when ROW_KEY does not identify the rows.
+    """
+    renamed = rename_columns(raw)
+    contents = row_hashes(renamed, RAW_COLUMNS)
+    duplicated = contents.duplicated()
+    if duplicated.any():
+        raw, renamed, contents = raw[~duplicated].reset_index(drop=True), renamed[~duplicated].reset_index(drop=True), contents[~duplicated]
+    old_keys, new_keys = row_hashes(cleaned, ROW_KEY), row_hashes(renamed, ROW_KEY)
+    if not (old_keys.is_unique and new_keys.is_unique):
+        raise ValueError("ROW_KEY does not identify the rows")
+
+    matches = old_keys.get_indexer(new_keys)
+    unchanged = (matches >= 0) & (row_fingerprints(cleaned)[matches] == contents)
+    fresh = clean_data(raw[~unchanged])
+    if fresh.empty:
+        # Without rows, clean_data cannot infer the dtypes of the columns it derives
+        fresh = fresh.astype(cleaned.dtypes.to_dict())
+    # Position of every new row in cleaned + fresh
+    order = matches.copy()
+    order[~unchanged] = len(cleaned) + np.arange(len(fresh))
+    data = pd.concat([cleaned, fresh], ignore_index=True).take(order).reset_index(drop=True)
+
+    removed = np.ones(len(cleaned), dtype=bool)
+    removed[matches[unchanged]] = False
+    changed = pd.concat([cleaned.loc[removed, ROW_KEY + ['Code_region']], fresh[ROW_KEY + ['Code_region']]], ignore_index=True)
+    return data, changed
+
+def patch_level(level, fresh, touched, keys) -> pd.DataFrame:
+    """
+    Replace the `touched` groups (a frame of keys) of a cube level by their
+    `fresh` aggregates: updated groups stay in place, groups missing from
+    `fresh` are dropped and new ones are appended.
+    """
+    level_keys, fresh_keys = row_hashes(level, keys), row_hashes(fresh, keys)
+    sources = fresh_keys.get_indexer(level_keys)
+    keep = ~level_keys.isin(row_hashes(touched, keys)) | (sources >= 0)
+    patched, sources = level[keep].reset_index(drop=True), sources[keep]
+    updated = sources >= 0
+    for measure in CUBE_MEASURES:
+        values = patched[measure].to_numpy().copy()
+        values[updated] = fresh[measure].to_numpy()[sources[updated]]
+        patched[measure] = values
+    return pd.concat([patched, fresh[~fresh_keys.isin(level_keys)]], ignore_index=True)
+
+def patch_star_schema(schema, data, changed, compact=False, version='') -> StarSchema:
+    """
+    StarSchema of `data` built from the schema of its previous version (see
+    patch_clean_data for `changed`). Tables are split again and re-indexed,
+    but only the cube groups touched by a changed row, or by a changed
+    department population, are re-aggregated. Adding or removing a
+    department rebuilds the schema, and so does a change of the table
+    dtypes (compact mode: a category added or dropped, a wider integer type),
+    which the untouched cube groups would not follow.
+    """
+    facts, departments, regions, population = split_tables(data, compact)
+    if (not departments.index.equals(schema.departments.index)
+            or not facts.dtypes.equals(schema.facts.dtypes)
+            or not departments.dtypes.equals(schema.departments.dtypes)):
+        return build_star_schema(data, compact, version)
+
+    old_population = schema.population['population'].reindex(population.index)
+    moved = population.index[old_population.ne(population['population']).to_numpy()]
+    touched_facts = (row_hashes(facts, ROW_KEY).isin(row_hashes(changed, ROW_KEY))
+                     | row_hashes(facts, ['Code_department', 'year']).isin(row_hashes(moved.to_frame(), ['Code_department', 'year'])))
+
+    rows = cube_base(facts[touched_facts], departments, population)
+    touched = pd.concat([changed, rows], ignore_index=True)
+    cube, lower = {}, None
+    for level, keys in CUBE_KEYS.items():
+        if lower is not None:
+            # Roll the touched groups up from the patched level below
+            rows = cube[lower][row_hashes(cube[lower], keys).isin(row_hashes(touched, keys))]
+        touched = touched[keys].drop_duplicates()
+        cube[level] = patch_level(schema.cube[level], aggregate_level(rows, level), touched, keys)
+        lower = level
+    return freeze_schema(facts, departments, regions, population, cube, version)
+
+# --------------------------------------------------------------
+# Compact representation
+# --------------------------------------------------------------
+# Names live once per row in the dimension tables, so only the repeated
+# fact columns are worth turning into categoricals.
+CATEGORICAL_COLUMNS = ['Code_department', 'crime_type', 'entity_involved']
+
+def compact_frame(frame, categories=None):
+    """
+    Return a compact copy of a frame: string columns listed in
+    CATEGORICAL_COLUMNS become categoricals with sorted (stable) categories,
+    integers are downcast to the smallest type holding their range and floats to float32.
+    `categories` can force the categories of a column, e.g. {'Code_department': [...]}.
+    """
+    categories = categories or {}
+    columns = {}
+    for column in frame.columns:
+        values = frame[column]
+        if column in CATEGORICAL_COLUMNS:
+            values = values.astype(pd.CategoricalDtype(categories.get(column, np.sort(values.dropna().unique()))))
+        elif pd.api.types.is_integer_dtype(values):
+            values = pd.to_numeric(values, downcast='integer')
+        elif pd.api.types.is_float_dtype(values):
+            values = values.astype(np.float32)
+        columns[column] = values
+    return pd.DataFrame(columns, index=frame.index)
+
+# --------------------------------------------------------------
+# Read-only sharing
+# --------------------------------------------------------------
+def read_only_frame(frame):
+    """
+    The same frame over read-only views of its numpy buffers (no copy):
+    numeric and object columns and the codes of categorical columns. An
+    in-place write to them raises instead of altering data shared between
+    sessions. Arrow-backed string columns cannot be frozen this way: share
+    the frame through shallow copies only (see StarSchema), which
+    copy-on-write keeps from writing through to it.
+    """
+    columns = {}
+    for column in frame.columns:
+        values = frame[column].array
+        if isinstance(values, pd.Categorical):
+            values = pd.Categorical.from_codes(values.codes, dtype=values.dtype, validate=False)
+        elif isinstance(frame[column].dtype, np.dtype):
+            values = frame[column].to_numpy()
+            values.flags.writeable = False
+        columns[column] = pd.Series(values, index=frame.index, dtype=frame[column].dtype, copy=False)
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+def read_only_index(index):
+    """Freeze the position arrays of a row index (see build_row_index)."""
+    for positions in index.values():
+        for array in positions.values():
+            array.flags.writeable = False
+    return MappingProxyType(index)
+
+def memory_report(schema) -> pd.DataFrame:
+    """
+    Memory footprint of every column of a StarSchema, in bytes (deep, index included).
+    """
+    tables = {name: getattr(schema, name) for name in ['facts', 'departments', 'regions', 'population']}
+    tables.update({f"cube:{level}": frame for level, frame in schema.cube.items()})
+    rows = []
+    for table, frame in tables.items():
+        usage = frame.memory_usage(deep=True)
+        for column, size in usage.items():
+            dtype = frame.index.dtype if column == 'Index' else frame[column].dtype
+            rows.append({'table': table, 'column': column, 'dtype': str(dtype), 'bytes': int(size)})
+    for table, index in schema.indexes.items():
+        for dimension, positions in index.items():
+            size = sum(p.nbytes for p in positions.values())
+            rows.append({'table': f"index:{table}", 'column': dimension, 'dtype': 'int32', 'bytes': size})
+    return pd.DataFrame(rows)
@@ -1,53 +1,504 @@
 # chart functions to enforce consistent style
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import streamlit as st
-import missingno as msno
-import matplotlib.pyplot as plt
-import altair as alt
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import folium
-from streamlit_folium import st_folium
+from utils.io import load_raw_sample, MAP_BACKEND
+
+class LazyModule:
+    """
+    Stand-in for module `name`, imported on first attribute access, so plotting
+    and mapping libraries are loaded by the pages that draw with them.
+    Goes through importlib.import_module, whose import lock makes sessions
+    (threads) arriving together wait for a single, complete import.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self.name), attribute)
+
+def lazy_import(name) -> LazyModule:
+    """Module `name`, imported on first use (see LazyModule)."""
+    return LazyModule(name)
+
+px = lazy_import('plotly.express')
+folium = lazy_import('folium')
+pdk = lazy_import('pydeck')
+from utils.prep import (attach_departments, attach_population, attach_regions, build_baseline, duplicated_rows,
+                        FACT_COLUMNS, NATIONAL_SCOPE, NO_ROWS, rollup, select_positions)
 
 # --------------------------------------------------------------
 # Intermediate visualization functions
 # --------------------------------------------------------------
-def get_records_by_entity_type(data, entity_type: str) -> pd.DataFrame:
-    """Filter data by 'entity' type."""
-    return data[data['entity_involved'] == entity_type]
-
 def get_records_by_crime_type(data, crime_type: str) -> pd.DataFrame:
     """Filter data by 'crime_type'."""
     return data[data['crime_type'] == crime_type]
 
-def get_records_by_region(data, region_name) -> pd.DataFrame:
-    """Filter data by 'Region_name'."""
-    return data[data['Region_name'] == region_name]
+def take_rows(data, positions) -> pd.DataFrame:
+    """Rows at the given positions; a shallow copy of the table when positions is None."""
+    return data.copy(deep=False) if positions is None else data.take(positions)
+
+def get_records_by_region(schema, table, region_name) -> pd.DataFrame:
+    """Rows of a cube level ('department' or 'region') belonging to a region, found through the row index."""
+    codes = schema.regions.index[schema.regions['Region_name'] == region_name]
+    by_region = schema.indexes[table]['Code_region']
+    positions = [by_region[code] for code in codes if code in by_region]
+    return take_rows(schema.table(table), np.sort(np.concatenate(positions)) if positions else NO_ROWS)
+
+def filter_records(schema, table, selection) -> pd.DataFrame:
+    """
+    Apply a filter selection (entity, (first_year, last_year), crime_type) to
+    the fact table ('facts') or to a cube level, using the precomputed row
+    indexes instead of scanning. 'All' leaves a dimension unfiltered.
+    """
+    return take_rows(schema.table(table), select_positions(schema.indexes[table], selection))
+
+def add_mean_rate(aggregate) -> pd.DataFrame:
+    """Derive the mean 'rate_per_1000' of an aggregate of cube rows from its rate sum and record count."""
+    aggregate['rate_per_1000'] = aggregate['rate_sum'] / aggregate['records']
+    return aggregate
+
+def department_summary(data, schema, population=False) -> pd.DataFrame:
+    """
+    Aggregate department-level cube rows per department (total amount, mean
+    rate), then join department attributes and, optionally, the INSEE
+    population/housing of the first year seen for each department.
+    Rows are ordered by department name.
+    """
+    summary = data.groupby('Code_department', observed=True).agg({
+        'amount': 'sum',
+        'records': 'sum',
+        'rate_sum': 'sum',
+        'year': 'min'
+    }).reset_index()
+    summary = attach_departments(add_mean_rate(summary), schema).sort_values('Department_name', ignore_index=True)
+    if population:
+        summary = attach_population(summary, schema)
+    return summary
+
+def contributions_by_entity(data) -> dict:
+    """Amount and records per crime type of cube rows, one frame per entity type, in a single rollup."""
+    contributions = rollup(data, ['entity_involved', 'crime_type'], ['amount', 'records'])
+    return dict(tuple(contributions.groupby('entity_involved', observed=True)))
+
+def yearly_crime_type_totals(data) -> pd.DataFrame:
+    """Records ('count') and amount of cube rows per year and crime type."""
+    return rollup(data, ['year', 'crime_type'], ['records', 'amount']).rename(columns={'records': 'count'})
+
+def crime_type_amounts(data) -> pd.Series:
+    """Total amount of cube rows per crime type, largest first."""
+    return data.groupby('crime_type', observed=True)['amount'].sum().sort_values(ascending=False)
+
+def entity_summary(data) -> pd.DataFrame:
+    """Total amount, record count and mean rate of cube rows per entity type."""
+    summary = data.groupby('entity_involved', observed=True).agg({'amount': 'sum', 'records': 'sum', 'rate_sum': 'sum'})
+    return add_mean_rate(summary)[['amount', 'records', 'rate_per_1000']]
+
+def yearly_amounts(data) -> tuple:
+    """Total amount of cube rows per (year, entity type), and per year."""
+    by_entity = data.groupby(['year', 'entity_involved'], observed=True)['amount'].sum().reset_index()
+    return by_entity, data.groupby('year')['amount'].sum().reset_index()
+
+# --------------------------------------------------------------
+# Selection aggregates, memoized across sessions
+# --------------------------------------------------------------
+# Keyed on (schema version, selection); the schema itself is not hashed.
+SELECTION_CACHE_ENTRIES = 256     # most recently used selections kept
+SELECTION_CACHE_TTL = 3600        # seconds before an entry is recomputed
+
+selection_cache = st.cache_data(max_entries=SELECTION_CACHE_ENTRIES, ttl=SELECTION_CACHE_TTL, show_spinner=False)
+
+@selection_cache
+def selection_counts(_schema, version, selection) -> dict:
+    """Headline counts of a selection: records, regions, departments, years and crime types."""
+    national = filter_records(_schema, 'national', selection)
+    return {
+        'records': int(national['records'].sum()),
+        'regions': filter_records(_schema, 'region', selection)['Code_region'].nunique(),
+        'departments': filter_records(_schema, 'department', selection)['Code_department'].nunique(),
+        'years': national['year'].nunique(),
+        'crime_types': national['crime_type'].nunique(),
+    }
+
+@selection_cache
+def entity_counts(_schema, version, selection) -> pd.Series:
+    """Records per entity type of a selection, largest first."""
+    national = filter_records(_schema, 'national', selection)
+    return national.groupby('entity_involved', observed=True)['records'].sum().sort_values(ascending=False)
+
+@selection_cache
+def region_amounts(_schema, version, selection) -> pd.DataFrame:
+    """
+    Total amount per region of a selection, with region names and coordinates
+    ('latitude', 'longitude'). Regions with missing coordinates are dropped.
+    """
+    regions = filter_records(_schema, 'region', selection)
+    dept_data = attach_regions(regions.groupby('Code_region')['amount'].sum().reset_index(), _schema)
+    dept_data = dept_data.dropna(subset=['Region_lat', 'Region_lon', 'Region_name'])
+    return dept_data.rename(columns={'Region_lat': 'latitude', 'Region_lon': 'longitude'})
+
+@selection_cache
+def department_rates(_schema, version, selection):
+    """department_summary of a selection, or None when it has no rows."""
+    departments = filter_records(_schema, 'department', selection)
+    return department_summary(departments, _schema) if len(departments) else None
+
+@selection_cache
+def infraction_population_summary(_schema, version, selection):
+    """
+    department_summary (with population) of the infraction rows of a selection,
+    or None when it has none, e.g. because another entity type is selected.
+    """
+    entity, year_range, crime = selection
+    if entity not in ('All', 'Infraction'):
+        return None
+    infraction_data = filter_records(_schema, 'department', ('Infraction', year_range, crime))
+    return department_summary(infraction_data, _schema, population=True) if len(infraction_data) else None
+
+@selection_cache
+def region_baseline(_schema, version) -> dict:
+    """Region and national KPIs of a dataset version (see build_baseline)."""
+    return build_baseline(_schema)
+
+def selected_rates(schema, selection) -> np.ndarray:
+    """Non-missing 'rate_per_1000' values of the fact rows of a selection."""
+    rates = filter_records(schema, 'facts', selection)['rate_per_1000']
+    return rates.dropna().to_numpy(dtype=np.float64)
+
+@selection_cache
+def selection_quality(_schema, version, selection) -> dict:
+    """
+    Missing values per column and duplicated rows of the fact rows of a
+    selection, taken from the shared facts through the row indexes.
+    """
+    facts = filter_records(_schema, 'facts', selection)[FACT_COLUMNS]
+    duplicated = duplicated_rows(facts)
+    return {'missing': facts.isnull().sum(), 'duplicates': facts[duplicated].reset_index(drop=True)}
+
+@selection_cache
+def rate_statistics(_schema, version, selection) -> dict:
+    """Row count, mean, max and median crime rate of the fact rows of a selection."""
+    rates = filter_records(_schema, 'facts', selection)['rate_per_1000']
+    return {'rows': len(rates), 'mean': rates.mean(), 'max': rates.max(), 'median': rates.median()}
+
+@selection_cache
+def rate_histogram(_schema, version, selection, bins, kde=False) -> dict:
+    """
+    Histogram of the crime rates of a selection, binned server-side:
+    'counts' and 'edges' (see np.histogram), plus 'kde' = (x, y) when asked.
+    Its size depends on the number of bins, not on the number of rows.
+    """
+    rates = selected_rates(_schema, selection)
+    counts, edges = np.histogram(rates, bins=bins)
+    histogram = {'counts': counts, 'edges': edges}
+    if kde:
+        histogram['kde'] = kernel_density(rates, edges)
+    return histogram
+
+def kernel_density(values, edges, grid_size=512):
+    """
+    Gaussian kernel density of values (Scott's bandwidth) over the range of
+    the histogram edges, scaled to the counts of a histogram bin. Values are
+    first binned on a fine grid then convolved with the kernel, so the cost
+    does not grow with the kernel evaluations per row. None when undefined.
+    """
+    bandwidth = values.std() * len(values) ** (-1 / 5) if len(values) > 1 else 0
+    if bandwidth == 0:
+        return None
+    grid_counts, grid_edges = np.histogram(values, bins=grid_size, range=(edges[0], edges[-1]))
+    step = grid_edges[1] - grid_edges[0]
+    # A kernel longer than the grid would make the 'same' convolution longer than x
+    half_width = min(int(np.ceil(4 * bandwidth / step)), (grid_size - 1) // 2)
+    kernel = np.exp(-0.5 * (np.arange(-half_width, half_width + 1) * step / bandwidth) ** 2)
+    smoothed = np.convolve(grid_counts, kernel / kernel.sum(), mode='same')
+    x = (grid_edges[:-1] + grid_edges[1:]) / 2
+    return x, smoothed * (edges[1] - edges[0]) / step
+
+# --------------------------------------------------------------
+# Map layers
+# --------------------------------------------------------------
+MAP_WIDTH, MAP_HEIGHT = 700, 500
+
+def circle_layer(points, color, fill_opacity, weight, max_width) -> "folium.GeoJson":
+    """
+    A single GeoJSON layer of circle markers, one per row of `points`
+    (latitude, longitude, radius, fill_color, popup and tooltip columns).
+    Features are built column-wise and carry their own radius and fill color.
+    """
+    columns = [points[column].tolist() for column in ['longitude', 'latitude', 'radius', 'fill_color', 'popup', 'tooltip']]
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+            'properties': {'radius': radius, 'fill_color': fill_color, 'popup': popup, 'tooltip': tooltip},
+        }
+        for lon, lat, radius, fill_color, popup, tooltip in zip(*columns)
+    ]
+    return folium.GeoJson(
+        {'type': 'FeatureCollection', 'features': features},
+        marker=folium.CircleMarker(),
+        style_function=lambda feature: {
+            'radius': feature['properties']['radius'],
+            'fillColor': feature['properties']['fill_color'],
+            'color': color,
+            'fillOpacity': fill_opacity,
+            'weight': weight,
+        },
+        popup=folium.GeoJsonPopup(fields=['popup'], labels=False, max_width=max_width),
+        tooltip=folium.GeoJsonTooltip(fields=['tooltip'], labels=False),
+    )
+
+def show_map_html(html):
+    """Display a rendered Folium map."""
+    st.iframe(html, width=MAP_WIDTH, height=MAP_HEIGHT)
+
+@selection_cache
+def region_map_html(_schema, version, selection, map_choice) -> str:
+    """
+    Rendered map of the amount per region of a selection (see region_amounts),
+    cached per (schema version, selection, map view).
+    """
+    dept_data = region_amounts(_schema, version, selection)
+    zoom_start = 2 if map_choice == "All Territories" else 6
+    m = folium.Map(location=[46.6034, 1.8883], zoom_start=zoom_start, tiles='OpenStreetMap')
+
+    # Size and color (violet scale) grow with the amount
+    color_intensity = dept_data['amount'] / dept_data['amount'].max()
+    red = (221 - 83 * color_intensity).astype(int).astype(str)
+    green = (160 - 160 * color_intensity).astype(int).astype(str)
+    blue = (221 - 89 * color_intensity).astype(int).astype(str)
+    names, amounts = dept_data['Region_name'], dept_data['amount'].map('{:,.0f}'.format)
+    points = pd.DataFrame({
+        'latitude': dept_data['latitude'],
+        'longitude': dept_data['longitude'],
+        'radius': 10 + color_intensity * 40,
+        'fill_color': 'rgba(' + red + ', ' + green + ', ' + blue + ', 0.8)',
+        'popup': ('<b>' + names + '</b><br>Amount: ' + amounts + '<br>Coordinates: '
+                  + dept_data['latitude'].map('{:.2f}'.format) + ', ' + dept_data['longitude'].map('{:.2f}'.format)),
+        'tooltip': names + ': ' + amounts,
+    })
+    circle_layer(points, color='pink', fill_opacity=0.7, weight=2, max_width=200).add_to(m)
+    return m.get_root().render()
+
+@selection_cache
+def department_comparison(_schema, version, region_name) -> pd.DataFrame:
+    """department_summary (with population) of the departments of a region, highest mean rate first."""
+    region_data = get_records_by_region(_schema, 'department', region_name)
+    dept_comparison = department_summary(region_data, _schema, population=True)
+    return dept_comparison.sort_values('rate_per_1000', ascending=False)
+
+@selection_cache
+def department_map_html(_schema, version, region_name) -> str:
+    """
+    Rendered map comparing the departments of a region by mean rate,
+    cached per (schema version, region).
+    """
+    dept_comparison = department_comparison(_schema, version, region_name)
+
+    region_coordinates = attach_regions(dept_comparison[['Code_region']], _schema)
+    m = folium.Map(
+        location=[region_coordinates['Region_lat'].mean(), region_coordinates['Region_lon'].mean()],
+        zoom_start=8,
+        tiles='OpenStreetMap'
+    )
+
+    # Size between 15-50, color from green (lowest rate) to red (highest rate)
+    rates = dept_comparison['rate_per_1000'].astype(float)
+    max_rate, min_rate = rates.max(), rates.min()
+    rate_normalized = (rates - min_rate) / (max_rate - min_rate) if max_rate != min_rate else pd.Series(0.5, index=rates.index)
+    red = (255 * rate_normalized).astype(int).astype(str)
+    green = (255 * (1 - rate_normalized)).astype(int).astype(str)
+    names = dept_comparison['Department_name']
+    rank = pd.Series(np.arange(1, len(dept_comparison) + 1), index=dept_comparison.index).astype(str)
+    points = pd.DataFrame({
+        'latitude': dept_comparison['Department_lat'].astype(float),
+        'longitude': dept_comparison['Department_lon'].astype(float),
+        'radius': 15 + rates / max_rate * 35,
+        'fill_color': 'rgb(' + red + ', ' + green + ', 0)',
+        'popup': (
+            '<div style="font-family: Arial; width: 200px;">'
+            '<h4 style="margin: 0; color: #333;">' + names + '</h4>'
+            '<hr style="margin: 5px 0;">'
+            '<b>Rate:</b> ' + rates.map('{:.2f}'.format) + ' per 1,000<br>'
+            '<b>Total Depositions:</b> ' + dept_comparison['amount'].map('{:,}'.format) + '<br>'
+            '<b>Population:</b> ' + dept_comparison['population'].map('{:,}'.format) + '<br>'
+            '<b>Rank:</b> #' + rank + f' in {region_name}'
+            '</div>'
+        ),
+        'tooltip': names + ': ' + rates.map('{:.2f}'.format) + '/1000',
+    })
+    circle_layer(points, color='darkred', fill_opacity=0.8, weight=2, max_width=250).add_to(m)
+    return m.get_root().render()
+
+def region_deck(dept_data, map_choice) -> "pdk.Deck":
+    """
+    WebGL (pydeck) counterpart of region_map_html: a scatterplot layer drawn
+    in the browser from columnar data, sized and colored by amount.
+    """
+    color_intensity = dept_data['amount'] / dept_data['amount'].max()
+    points = pd.DataFrame({
+        'Region_name': dept_data['Region_name'],
+        'latitude': dept_data['latitude'].astype(float),
+        'longitude': dept_data['longitude'].astype(float),
+        'amount_label': dept_data['amount'].map('{:,.0f}'.format),
+        'radius': 10 + color_intensity * 40,
+        'red': (221 - 83 * color_intensity).astype(int),
+        'green': (160 - 160 * color_intensity).astype(int),
+        'blue': (221 - 89 * color_intensity).astype(int),
+    })
+    layer = pdk.Layer(
+        'ScatterplotLayer',
+        points,
+        get_position=['longitude', 'latitude'],
+        get_radius='radius',
+        radius_units='pixels',
+        get_fill_color=['red', 'green', 'blue', 204],
+        get_line_color=[255, 192, 203],
+        line_width_min_pixels=2,
+        stroked=True,
+        pickable=True,
+    )
+    zoom = 1 if map_choice == "All Territories" else 5
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(latitude=46.6034, longitude=1.8883, zoom=zoom),
+        tooltip={'html': '<b>{Region_name}</b><br>Amount: {amount_label}'},
+        map_style=None,
+    )
+
+def department_deck(dept_comparison, region_name) -> "pdk.Deck":
+    """
+    WebGL (pydeck) counterpart of department_map_html: one extruded column per
+    department, its height and color (green to red) following the mean rate.
+    """
+    rates = dept_comparison['rate_per_1000'].astype(float)
+    max_rate, min_rate = rates.max(), rates.min()
+    rate_normalized = (rates - min_rate) / (max_rate - min_rate) if max_rate != min_rate else pd.Series(0.5, index=rates.index)
+    columns = pd.DataFrame({
+        'Department_name': dept_comparison['Department_name'],
+        'latitude': dept_comparison['Department_lat'].astype(float),
+        'longitude': dept_comparison['Department_lon'].astype(float),
+        'rate': rates,
+        'rate_label': rates.map('{:.2f}'.format),
+        'amount_label': dept_comparison['amount'].map('{:,}'.format),
+        'rank': np.arange(1, len(dept_comparison) + 1),
+        'red': (255 * rate_normalized).astype(int),
+        'green': (255 * (1 - rate_normalized)).astype(int),
+    })
+    layer = pdk.Layer(
+        'ColumnLayer',
+        columns,
+        get_position=['longitude', 'latitude'],
+        get_elevation='rate',
+        elevation_scale=20000 / max_rate,
+        radius=8000,
+        get_fill_color=['red', 'green', 0, 220],
+        extruded=True,
+        pickable=True,
+    )
+    return pdk.Deck(
+        layers=[layer],
+        initial_view_state=pdk.ViewState(
+            latitude=columns['latitude'].mean(), longitude=columns['longitude'].mean(), zoom=6.5, pitch=45
+        ),
+        tooltip={'html': '<b>{Department_name}</b><br>Rate: {rate_label} per 1,000<br>'
+                         'Total Depositions: {amount_label}<br>Rank: #{rank} in ' + region_name},
+        map_style=None,
+    )
+
+# --------------------------------------------------------------
+# Figure cache
+# --------------------------------------------------------------
+FIGURE_CACHE_ENTRIES = 512        # most recently used figures kept
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def figure_spec(kind, data, options, layout, traces, xaxes, add_traces) -> dict:
+    """Build a plotly express figure and return it serialized (see cached_figure)."""
+    fig = getattr(px, kind)(data, **options) if data is not None else getattr(px, kind)(**options)
+    if layout:
+        fig.update_layout(**layout)
+    if traces:
+        fig.update_traces(**traces)
+    if xaxes:
+        fig.update_xaxes(**xaxes)
+    for trace in add_traces or []:
+        fig.add_trace(trace)
+    return fig.to_dict()
+
+def cached_figure(kind, data=None, layout=None, traces=None, xaxes=None, add_traces=None, **options) -> dict:
+    """
+    px.<kind>(data, **options) followed by update_layout(**layout),
+    update_traces(**traces), update_xaxes(**xaxes) and add_trace for each of
+    add_traces, as a figure dict for st.plotly_chart. Figures are cached by a
+    fingerprint of their input aggregate and options, so an unchanged chart
+    is not rebuilt on rerun.
+    """
+    # Streamlit fingerprints a Series by content but cannot hash an Index
+    options = {
+        name: pd.Series(value, name=value.name) if isinstance(value, pd.Index) else value
+        for name, value in options.items()
+    }
+    return figure_spec(kind, data, options, layout, traces, xaxes, add_traces)
+
 # --------------------------------------------------------------
 # Data preparation visualization functions
 # --------------------------------------------------------------
-def show_missing_data(data):
-    """Display missing data matrix using missingno."""
+MATRIX_SAMPLE_SIZES = [500, 1000, 2000, 5000]
+
+def show_missing_data(profile):
+    """
+    Display the share of missing values per column and per year or
+    department as a heatmap (see prep.nullity_profile). A missingno matrix
+    of a row sample is only drawn on request.
+    """
     st.markdown("### Missing Data Visualization")
-    fig, ax = plt.subplots(figsize=(10, 4))
-    msno.matrix(data, ax=ax)
-    st.pyplot(fig)
+    missing = int(profile['columns'].sum())
+    st.write(f"{missing:,} missing values over {profile['rows']:,} rows and {len(profile['columns'])} columns.")
+
+    group = st.radio("Missing values by", ['year', 'department'], horizontal=True)
+    counts = profile[group]
+    fractions = counts.drop(columns='rows').div(counts['rows'], axis=0)
+    fractions = fractions.rename(index=lambda key: '(missing)' if pd.isna(key) else key)
+    fig = cached_figure(
+        'imshow',
+        fractions.T,
+        zmin=0,
+        zmax=1,
+        aspect='auto',
+        color_continuous_scale='Reds',
+        labels=dict(x=group.capitalize(), y='Column', color='Missing share'),
+        title=f"Share of missing values per column and {group}",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    if st.checkbox("Show a row-level matrix of a sample"):
+        import matplotlib.pyplot as plt
+        import missingno as msno
+        size = st.select_slider("Sample size (rows)", MATRIX_SAMPLE_SIZES, value=1000)
+        fig, ax = plt.subplots(figsize=(10, 4))
+        msno.matrix(load_raw_sample(size), ax=ax, sparkline=False)
+        st.pyplot(fig)
 
-def show_duplicates(data):
-    """Display number of duplicate rows."""
+def show_duplicates(duplicates):
+    """Display the number of duplicate rows, and the rows if there are any."""
     st.markdown("### Duplicate Rows")
-    num_duplicates = data.duplicated().sum()
-    st.write(f"Number of duplicate rows: {num_duplicates}")
-    if num_duplicates > 0:
-        st.dataframe(data[data.duplicated()])
+    st.write(f"Number of duplicate rows: {len(duplicates)}")
+    if len(duplicates) > 0:
+        st.dataframe(duplicates)
 
 # --------------------------------------------------------------
 # Overview visualization functions
 # --------------------------------------------------------------
-def crime_type_contribution_by_entity(data):
+def crime_type_contribution_by_entity(schema):
     """Display crime type contribution by entity involved."""
     st.markdown("### Crime Type Contribution by Entity Involved")
 
+    data = schema.table('national')
     entities = data['entity_involved'].unique()
+    by_entity = contributions_by_entity(data)
     
     if len(entities) <= 3:
         cols = st.columns(len(entities))
@@ -60,35 +511,32 @@ def crime_type_contribution_by_entity(data):
         col_index = i % 3 if len(entities) > 3 else i
         
         with cols[col_index]:
-            entity_data = get_records_by_entity_type(data, entity)
+            entity_data = by_entity[entity]
             
-            crime_type_amounts = entity_data.groupby('crime_type')['amount'].sum()
-            
-            fig = px.pie(
-                values=crime_type_amounts.values, 
-                names=crime_type_amounts.index,
-                title=f"<b>{entity}</b><br><sub>{len(entity_data):,} records</sub>", 
-                hole=0.4
-            )
-            
-            fig.update_layout(
-                legend=dict(
-                    orientation="h",
-                    yanchor="top",
-                    y=-0.05,
-                    xanchor="center",
-                    x=0.5,
-                    font=dict(size=9)
+            fig = cached_figure(
+                'pie',
+                values=entity_data['amount'].to_numpy(), 
+                names=entity_data['crime_type'],
+                title=f"<b>{entity}</b><br><sub>{entity_data['records'].sum():,} records</sub>", 
+                hole=0.4,
+                layout=dict(
+                    legend=dict(
+                        orientation="h",
+                        yanchor="top",
+                        y=-0.05,
+                        xanchor="center",
+                        x=0.5,
+                        font=dict(size=9)
+                    ),
+                    margin=dict(l=10, r=10, t=80, b=80),
+                    height=350,
+                    showlegend=True
                 ),
-                margin=dict(l=10, r=10, t=80, b=80),
-                height=350,
-                showlegend=True
-            )
-            
-            fig.update_traces(
-                textinfo='percent',
-                textposition='inside',
-                textfont_size=8
+                traces=dict(
+                    textinfo='percent',
+                    textposition='inside',
+                    textfont_size=8
+                )
             )
             
             st.plotly_chart(fig, use_container_width=True)
@@ -100,9 +548,10 @@ def crime_type_contribution_by_entity(data):
     - This highlights the importance of considering the context and relationships between different entities when analyzing crime data.
     """)
 
-def create_filters(data):
-    """Create interactive filters and return filtered data."""
+def create_filters(schema):
+    """Create interactive filters and return the selection (entity, year range, crime type)."""
     st.markdown("#### 🔧 Filters")
+    data = schema.table('national')
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -117,56 +566,45 @@ def create_filters(data):
         crime_types = ['All'] + list(data['crime_type'].unique())
         selected_crime = st.selectbox("Crime Type", crime_types)
     
-    # Apply filters
-    filtered_data = data.copy()
-    if selected_entity != 'All':
-        filtered_data = get_records_by_entity_type(filtered_data, selected_entity)
-    
-    filtered_data = filtered_data[
-        (filtered_data['year'] >= year_range[0]) & 
-        (filtered_data['year'] <= year_range[1])
-    ]
-    
-    if selected_crime != 'All':
-        filtered_data = get_records_by_crime_type(filtered_data, selected_crime)
-    
+    selection = (selected_entity, tuple(year_range), selected_crime)
+
     # Show filter impact
-    if len(filtered_data) != len(data):
-        st.info(f"📊 Showing {len(filtered_data):,} records (filtered from {len(data):,})")
+    total_records = data['records'].sum()
+    selected_records = selection_counts(schema, schema.version, selection)['records']
+    if selected_records != total_records:
+        st.info(f"📊 Showing {selected_records:,} records (filtered from {total_records:,})")
     
-    return filtered_data
+    return selection
 
-def overview_metrics(filtered_data):
+def overview_metrics(schema, selection):
     """Display overview metrics in a row of columns."""
     st.markdown("#### 📈 Overview Metrics")
+    counts = selection_counts(schema, schema.version, selection)
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        st.metric("Total Records", f"{len(filtered_data):,}")
+        st.metric("Total Records", f"{counts['records']:,}")
     with col2:
-        regions = filtered_data['Code_region'].nunique()
-        st.metric("Regions", f"{regions}")
+        st.metric("Regions", f"{counts['regions']}")
     with col3:
-        departments = filtered_data['Code_department'].nunique()
-        st.metric("Departments", f"{departments}")
+        st.metric("Departments", f"{counts['departments']}")
     with col4:
-        years_covered = filtered_data['year'].nunique()
-        st.metric("Years Covered", f"{years_covered}")
+        st.metric("Years Covered", f"{counts['years']}")
     with col5:
-        crime_types_count = filtered_data['crime_type'].nunique()
-        st.metric("Crime Types", f"{crime_types_count}")
+        st.metric("Crime Types", f"{counts['crime_types']}")
 
-def entity_distribution(filtered_data):
+@st.fragment
+def entity_distribution(schema, selection):
     """Display entity type distribution with chart selection."""
     st.markdown("#### 📋 Entity Type Distribution of Records")
     
-    entity_counts = filtered_data['entity_involved'].value_counts()
+    entity_totals = entity_counts(schema, schema.version, selection)
     
     # Check if there's only one entity type after filtering
-    if len(entity_counts) <= 1:
-        if len(entity_counts) == 1:
-            entity_name = entity_counts.index[0]
-            entity_count = entity_counts.iloc[0]
+    if len(entity_totals) <= 1:
+        if len(entity_totals) == 1:
+            entity_name = entity_totals.index[0]
+            entity_count = entity_totals.iloc[0]
             st.info(f"📊 All {entity_count:,} records are of type: **{entity_name}**")
         else:
             st.warning("⚠️ No entity data available with current filters.")
@@ -176,13 +614,13 @@ def entity_distribution(filtered_data):
     chart_type = st.radio("Chart Type", ["Bar Chart", "Donut Chart"], horizontal=True)
     
     if chart_type == "Bar Chart":
-        fig = px.bar(x=entity_counts.index, y=entity_counts.values, color=entity_counts.index,
-                    title="Records by Entity Type")
-        fig.update_layout(xaxis_title="Entity Type", yaxis_title="Count")
+        fig = cached_figure('bar', x=entity_totals.index, y=entity_totals.values, color=entity_totals.index,
+                            title="Records by Entity Type",
+                            layout=dict(xaxis_title="Entity Type", yaxis_title="Count"))
         st.plotly_chart(fig, use_container_width=True)
     else:  # Donut Chart
-        fig = px.pie(values=entity_counts.values, names=entity_counts.index,
-                    title="Records by Entity Type", hole=0.4)
+        fig = cached_figure('pie', values=entity_totals.values, names=entity_totals.index,
+                            title="Records by Entity Type", hole=0.4)
         st.plotly_chart(fig, use_container_width=True)
     st.info("""
     💡 **Analysis:**
@@ -191,81 +629,28 @@ def entity_distribution(filtered_data):
     - Over the years, Victims consistently represent the majority of records, highlighting their central role in crime reporting.
     """)
 
-def map_records_by_region(filtered_data):
+@st.fragment
+def map_records_by_region(schema, selection):
     """Display records by region using Folium with proper DOM-TOM handling."""
     st.markdown("#### 🗺️ Records by Region")
     
-    # Check if coordinate columns exist in filtered data
-    if 'Region_lat' not in filtered_data.columns or 'Region_lon' not in filtered_data.columns:
-        st.error("Geographic coordinate data is missing from the filtered dataset.")
-        return
-    
-    # Remove rows with missing coordinates BEFORE grouping
-    filtered_data_with_coords = filtered_data.dropna(subset=['Region_lat', 'Region_lon', 'Region_name'])
+    # Sum the region roll-up of the cube, then join region coordinates
+    dept_data = region_amounts(schema, schema.version, selection)
     
-    if len(filtered_data_with_coords) == 0:
+    if len(dept_data) == 0:
         st.warning("No data with valid coordinates found after filtering.")
         return
     
-    # Group by region and preserve coordinates
-    dept_data = filtered_data_with_coords.groupby(['Region_name']).agg({
-        'amount': 'sum',
-        'Region_lat': 'first',  # Take first coordinate value for each region
-        'Region_lon': 'first'   # Take first coordinate value for each region
-    }).reset_index()
-    
-    # Rename columns for clarity
-    dept_data = dept_data.rename(columns={
-        'Region_lat': 'latitude',
-        'Region_lon': 'longitude'
-    })
-    
     # Map selection
     map_choice = st.radio(
         "Select Map View", 
         ["All Territories", "Zoom on Metropolitan France"], 
         horizontal=True
     )
-    
-    if map_choice == "All Territories":
-        zoom_start = 2
+    if MAP_BACKEND == "pydeck":
+        st.pydeck_chart(region_deck(dept_data, map_choice))
     else:
-        zoom_start = 6
-        
-    m = folium.Map(
-        location=[46.6034, 1.8883],
-        zoom_start=zoom_start, 
-        tiles='OpenStreetMap'
-    )       
-    
-    # Add circles to the map
-    if len(dept_data) > 0:
-        max_amount = dept_data['amount'].max()
-        
-        for _, row in dept_data.iterrows():
-            size = 10 + (row['amount'] / max_amount) * (40)
-            
-            # Color based on amount (violet scale)
-            color_intensity = (row['amount'] / max_amount)
-            color = f"rgba({int(221 - 83 * color_intensity)}, {int(160 - 160 * color_intensity)}, {int(221 - 89 * color_intensity)}, 0.8)"
-            
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=size,
-                popup=folium.Popup(
-                    f"<b>{row['Region_name']}</b><br>"
-                    f"Amount: {row['amount']:,.0f}<br>"
-                    f"Coordinates: {row['latitude']:.2f}, {row['longitude']:.2f}",
-                    max_width=200
-                ),
-                tooltip=f"{row['Region_name']}: {row['amount']:,.0f}",
-                color='pink',
-                fillColor=color,
-                fillOpacity=0.7,
-                weight=2
-            ).add_to(m)
-    
-    st_folium(m, width=700, height=500)
+        show_map_html(region_map_html(schema, schema.version, selection, map_choice))
     
     # Show top regions
     if len(dept_data) > 0:
@@ -285,35 +670,42 @@ def map_records_by_region(filtered_data):
     - Urban regions, particularly in metropolitan France, tend to have larger circles, reflecting higher reporting activity likely due to population density.
     """)
 
-def crime_rate_analysis(filtered_data):
+@st.fragment
+def crime_rate_analysis(schema, selection):
     """Display crime rate analysis for all entity types."""
     st.markdown("#### 🚨 Crime Rate Analysis")
     
-    if len(filtered_data) == 0:
+    stats = rate_statistics(schema, schema.version, selection)
+    if stats['rows'] == 0:
         st.warning("⚠️ No data available with current filters for crime rate analysis.")
         return
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        avg_rate = filtered_data['rate_per_1000'].mean()
-        st.metric("Average Crime Rate", f"{avg_rate:.2f} per 1,000")
+        st.metric("Average Crime Rate", f"{stats['mean']:.2f} per 1,000")
     with col2:
-        max_rate = filtered_data['rate_per_1000'].max()
-        st.metric("Highest Crime Rate", f"{max_rate:.2f} per 1,000")
+        st.metric("Highest Crime Rate", f"{stats['max']:.2f} per 1,000")
     with col3:
-        median_rate = filtered_data['rate_per_1000'].median()
-        st.metric("Median Crime Rate", f"{median_rate:.2f} per 1,000")
+        st.metric("Median Crime Rate", f"{stats['median']:.2f} per 1,000")
 
-    # Histogram
+    # Histogram, binned server-side: only the bars are sent to the browser
     st.markdown("**Crime Rate Distribution:**")
     bins = st.slider("Number of bins", 10, 100, 30)
-    fig_hist = px.histogram(
-        filtered_data, 
-        x='rate_per_1000', 
-        nbins=bins,
+    show_kde = st.checkbox("Show density curve (KDE)", value=False)
+    histogram = rate_histogram(schema, schema.version, selection, bins, kde=show_kde)
+    edges, kde = histogram['edges'], histogram.get('kde')
+    fig_hist = cached_figure(
+        'bar',
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=histogram['counts'],
         title="Distribution of Crime Rates (All Entities)", 
         color_discrete_sequence=['steelblue'],
-        labels={'rate_per_1000': 'Crime Rate per 1,000 inhabitants'}
+        labels={'x': 'Crime Rate per 1,000 inhabitants', 'y': 'count'},
+        traces=dict(width=np.diff(edges)),
+        layout=dict(bargap=0),
+        add_traces=[
+            dict(type='scatter', x=kde[0], y=kde[1], mode='lines', name='Density (KDE)', line_color='darkred')
+        ] if kde is not None else None
     )
     st.plotly_chart(fig_hist, use_container_width=True)
     
@@ -326,17 +718,19 @@ def crime_rate_analysis(filtered_data):
              entities with elevated crime reporting. It can be caused by smaller populations or active police/judicial systems.
     """)
 
-def geographic_insights(filtered_data):
+@st.fragment
+def geographic_insights(schema, selection):
     """Display geographic insights with department rankings."""
     st.markdown("#### 🗺️ Geographic Insights")
     
-    if len(filtered_data) == 0:
+    dept_rates = department_rates(schema, schema.version, selection)
+    if dept_rates is None:
         st.warning("⚠️ No data available with current filters for geographic analysis.")
         return
     
     view_type = st.radio("View", ["Top 10 Departments", "Bottom 10 Departments", "All Departments"], horizontal=True)
 
-    dept_stats = filtered_data.groupby('Department_name')['rate_per_1000'].mean().sort_values(ascending=False)
+    dept_stats = dept_rates.set_index('Department_name')['rate_per_1000'].sort_values(ascending=False)
     
     if view_type == "Top 10 Departments":
         display_data = dept_stats.head(10)
@@ -345,20 +739,20 @@ def geographic_insights(filtered_data):
     else:
         display_data = dept_stats
 
-    fig_geo = px.bar(
+    fig_geo = cached_figure(
+        'bar',
         x=display_data.index, 
         y=display_data.values,
         color=display_data.values,
         color_continuous_scale='Reds',
-        title=f"{view_type} by Average Deposition Rate"
-    )
-    
-    fig_geo.update_layout(
-        xaxis_title="Department Name", 
-        yaxis_title="Average Deposition Rate per 1,000",
-        showlegend=False
+        title=f"{view_type} by Average Deposition Rate",
+        layout=dict(
+            xaxis_title="Department Name",
+            yaxis_title="Average Deposition Rate per 1,000",
+            showlegend=False
+        ),
+        xaxes=dict(tickangle=45)
     )
-    fig_geo.update_xaxes(tickangle=45) 
     st.plotly_chart(fig_geo, use_container_width=True)
     
     col1, col2 = st.columns(2)
@@ -384,11 +778,10 @@ def geographic_insights(filtered_data):
     - Small departments may show higher rates due to population size effects.
     """)
 
-def temporal_trends(data):
+def temporal_trends(schema):
     """Display temporal trends analysis."""
     st.markdown("#### 📅 Temporal Trends (regardless of filter)")
-    yearly_trends = data.groupby(['year', 'crime_type']).size().reset_index(name='count')
-    yearly_trends['amount'] = data.groupby(['year', 'crime_type'])['amount'].sum().values
+    yearly_trends = yearly_crime_type_totals(schema.table('national'))
 
     # Entity selector for trend
     crime_selector = st.multiselect(
@@ -399,8 +792,8 @@ def temporal_trends(data):
 
     if crime_selector:
         trend_data = yearly_trends[yearly_trends['crime_type'].isin(crime_selector)]
-        fig_trend = px.line(trend_data, x='year', y='amount', color='crime_type',
-                            title="Temporal Trends by Crime Type")
+        fig_trend = cached_figure('line', trend_data, x='year', y='amount', color='crime_type',
+                                  title="Temporal Trends by Crime Type")
         st.plotly_chart(fig_trend, use_container_width=True)
     st.info("""
     💡 **Analysis:**
@@ -410,13 +803,14 @@ def temporal_trends(data):
     - The trends seem relatively stable overall, with some fluctuations in specific crime types.
     """)
 
-def data_quality(filtered_data):
+def data_quality(schema, selection):
     """Display data quality information in an expandable section."""
+    quality = selection_quality(schema, schema.version, selection)
     with st.expander("✅ Data Quality Details", expanded=False):
         col1, col2 = st.columns(2)
         
         with col1:
-            missing_by_col = filtered_data.isnull().sum()
+            missing_by_col = quality['missing']
             if missing_by_col.sum() > 0:
                 st.write("**Missing Values by Column:**")
                 st.dataframe(missing_by_col[missing_by_col > 0])
@@ -424,26 +818,22 @@ def data_quality(filtered_data):
                 st.success("No missing values!")
                 
         with col2:
-            duplicates = filtered_data.duplicated().sum()
+            duplicates = len(quality['duplicates'])
             st.metric("Duplicates", f"{duplicates:,}")
             if duplicates > 0:
                 if st.button("Show duplicate rows"):
-                    st.dataframe(filtered_data[filtered_data.duplicated()])
+                    st.dataframe(quality['duplicates'])
 
-def crime_rate_by_population(filtered_data):
+def crime_rate_by_population(schema, selection):
     """Display crime rate analysis in relation to population size for infractions."""
-    if 'Infraction' not in filtered_data['entity_involved'].values:
+    # Total crimes and average rate per department, with its population
+    dept_analysis = infraction_population_summary(schema, schema.version, selection)
+    if dept_analysis is None:
         st.warning("⚠️ No infraction data available with current filters for crime rate analysis.")
         return
     
-    infraction_data = get_records_by_entity_type(filtered_data, 'Infraction')
     st.markdown("#### 🚨 Crime Rate Analysis")
     
-    dept_analysis = infraction_data.groupby('Department_name').agg({
-        'amount': 'sum',           # Total crimes in department
-        'population': 'first',     # Population (should be same for each dept)
-        'rate_per_1000': 'mean'    # Average crime rate
-    }).reset_index()
     
     # Key metrics based on department-level data
     col1, col2, col3 = st.columns(3)
@@ -459,7 +849,8 @@ def crime_rate_by_population(filtered_data):
         st.metric("Median Crime Rate", f"{median_rate:.2f} per 1,000")
     
     
-    fig_scatter = px.scatter(
+    fig_scatter = cached_figure(
+        'scatter',
         dept_analysis,
         x='population',
         y='rate_per_1000',
@@ -479,13 +870,12 @@ def crime_rate_by_population(filtered_data):
         log_x=True,  # Log scale for better visualization
         size_max=50,
         color='rate_per_1000',
-        color_continuous_scale='Reds'
-    )
-    
-    fig_scatter.update_layout(
-        xaxis_title="Population (log scale)",
-        yaxis_title="Crime Rate (per 1,000 inhabitants)",
-        showlegend=False
+        color_continuous_scale='Reds',
+        layout=dict(
+            xaxis_title="Population (log scale)",
+            yaxis_title="Crime Rate (per 1,000 inhabitants)",
+            showlegend=False
+        )
     )
     
     st.plotly_chart(fig_scatter, use_container_width=True)
@@ -501,40 +891,42 @@ def crime_rate_by_population(filtered_data):
     **Key insight**: Large populations don't necessarily mean high crime rates!
     """)
 
-def show_kpis(data):
+def show_kpis(schema):
     """Display comprehensive interactive key performance indicators."""
     st.markdown("### 📊 Key Performance Indicators")
     st.write("Explore key metrics and visualizations to understand reported offences in France.")
     st.write("---")
-    crime_type_contribution_by_entity(data)
+    crime_type_contribution_by_entity(schema)
     st.write("---")
-    filtered_data = create_filters(data)
-    data_quality(filtered_data)
+    # Widgets inside the fragments below (chart type, map view, bins, ranking view)
+    # only rerun their own block, with the selection of the last full run
+    selection = create_filters(schema)
+    data_quality(schema, selection)
     st.write("---")
     # Show different sections
-    overview_metrics(filtered_data)
+    overview_metrics(schema, selection)
     st.write("---")
-    entity_distribution(filtered_data)
+    entity_distribution(schema, selection)
     st.write("---")
-    map_records_by_region(filtered_data)
+    map_records_by_region(schema, selection)
     st.write("---")
-    crime_rate_analysis(filtered_data)
+    crime_rate_analysis(schema, selection)
     st.write("---")
-    geographic_insights(filtered_data) 
+    geographic_insights(schema, selection)
     st.write("---") 
-    crime_rate_by_population(filtered_data)
+    crime_rate_by_population(schema, selection)
     st.write("---")
-    temporal_trends(data)
+    temporal_trends(schema)
 
 # --------------------------------------------------------------
 # Regional comparison visualization functions
 # --------------------------------------------------------------
 
-def select_region_for_analysis(data):
+def select_region_for_analysis(schema):
     """Allow user to select a specific region for detailed analysis."""
     st.markdown("### 🏛️ Regional Analysis")
     
-    available_regions = sorted(data['Region_name'].unique())
+    available_regions = sorted(schema.regions['Region_name'].unique())
     
     selected_region = st.selectbox(
         "Select a Region for Detailed Analysis", 
@@ -542,34 +934,38 @@ def select_region_for_analysis(data):
         help="Choose a region to explore its crime patterns in detail"
     )
     
-    region_data = get_records_by_region(data, selected_region)
+    region_data = get_records_by_region(schema, 'department', selected_region)
+    region_records = region_baseline(schema, schema.version)['overall'].loc[selected_region, 'records']
 
-    st.info(f"📊 Analyzing **{selected_region}** with {len(region_data):,} records")
+    st.info(f"📊 Analyzing **{selected_region}** with {region_records:,} records")
     
     return region_data, selected_region
 
-def show_region_overview(data, region_data, region_name):
+def show_region_overview(schema, region_name):
     """Display key metrics for the selected region."""
     st.markdown(f"#### 📈 {region_name} - Overview")
+    # Region and national figures are looked up in the precomputed baseline
+    baseline = region_baseline(schema, schema.version)['overall']
+    region, national = baseline.loc[region_name], baseline.loc[NATIONAL_SCOPE]
     
     # Calculate key metrics
-    region_records = len(region_data)
-    total_records = len(data)
+    region_records = int(region['records'])
+    total_records = int(national['records'])
     region_pct = (region_records / total_records) * 100
     
-    region_departments = region_data['Department_name'].nunique()
-    total_departments = data['Department_name'].nunique()
+    region_departments = int(region['departments'])
+    total_departments = int(national['departments'])
 
-    region_depositions = region_data['amount'].sum()
-    total_depositions = data['amount'].sum()
+    region_depositions = int(region['amount'])
+    total_depositions = int(national['amount'])
     deposition_pct = (region_depositions / total_depositions) * 100
     
-    region_avg_rate = region_data['rate_per_1000'].mean()
-    national_avg_rate = data['rate_per_1000'].mean()
+    region_avg_rate = region['rate_per_1000']
+    national_avg_rate = national['rate_per_1000']
     
-    latest_year = data['year'].max()
-    region_pop = region_data[region_data['year'] == latest_year].groupby('Department_name')['population'].first().sum()
-    total_pop = data[data['year'] == latest_year].groupby('Department_name')['population'].first().sum()
+    # Population of the departments reported in the latest year
+    region_pop = region['population']
+    total_pop = national['population']
     pop_pct = (region_pop / total_pop) * 100
     
  
@@ -612,64 +1008,14 @@ def show_region_overview(data, region_data, region_name):
             delta_color="inverse"  # Higher crime rate = red
         )
 
-def show_region_departments_comparison(region_data, region_name):
+def show_region_departments_comparison(schema, region_name):
     """Compare departments within the selected region using a map."""
     st.markdown(f"#### 🏘️ {region_name} - Department Comparison")
     
-    dept_comparison = region_data.groupby('Department_name').agg({
-        'amount': 'sum',
-        'population': 'first',
-        'rate_per_1000': 'mean',
-        'Department_lat': 'first',
-        'Department_lon': 'first'
-    }).reset_index()
-    
-    # Sort by rate for analysis
-    dept_comparison = dept_comparison.sort_values('rate_per_1000', ascending=False)
-    
-    center_lat = region_data['Region_lat'].mean()
-    center_lon = region_data['Region_lon'].mean()
-    
-    m = folium.Map(
-        location=[center_lat, center_lon],
-        zoom_start=8,
-        tiles='OpenStreetMap'
-    )
-    
-    max_rate = dept_comparison['rate_per_1000'].max()
-    min_rate = dept_comparison['rate_per_1000'].min()
-    
-    for _, row in dept_comparison.iterrows():
-        size = 15 + (row['rate_per_1000'] / max_rate) * 35  # Size between 15-50        
-        # Color intensity based on rate (green to red scale)
-        rate_normalized = (row['rate_per_1000'] - min_rate) / (max_rate - min_rate) if max_rate != min_rate else 0.5
-        # Green to Red color scale
-        red = int(255 * rate_normalized)
-        green = int(255 * (1 - rate_normalized))
-        color = f"rgb({red}, {green}, 0)"
-        
-        popup_content = f"""
-        <div style="font-family: Arial; width: 200px;">
-            <h4 style="margin: 0; color: #333;">{row['Department_name']}</h4>
-            <hr style="margin: 5px 0;">
-            <b>Rate:</b> {row['rate_per_1000']:.2f} per 1,000<br>
-            <b>Total Depositions:</b> {row['amount']:,}<br>
-            <b>Population:</b> {row['population']:,}<br>
-            <b>Rank:</b> #{dept_comparison.index.get_loc(row.name) + 1} in {region_name}
-        </div>
-        """
-        
-        folium.CircleMarker(
-            location=[row['Department_lat'], row['Department_lon']],
-            radius=size,
-            popup=folium.Popup(popup_content, max_width=250),
-            tooltip=f"{row['Department_name']}: {row['rate_per_1000']:.2f}/1000",
-            color='darkred',
-            fillColor=color,
-            fillOpacity=0.8,
-            weight=2
-        ).add_to(m)
-    st_folium(m, width=700, height=500)
+    if MAP_BACKEND == "pydeck":
+        st.pydeck_chart(department_deck(department_comparison(schema, schema.version, region_name), region_name))
+    else:
+        show_map_html(department_map_html(schema, schema.version, region_name))
 
     st.info(f"""
     💡 **Map Analysis for {region_name}:**
@@ -681,29 +1027,25 @@ def show_region_departments_comparison(region_data, region_name):
     - Departments with lower rates may indicate rural areas or effective crime prevention measures.
     """)
 
-def show_region_departments_bar_chart(region_data, region_name):
+def show_region_departments_bar_chart(schema, region_data, region_name):
     """Fallback bar chart if coordinate data is not available."""
-    dept_comparison = region_data.groupby('Department_name').agg({
-        'amount': 'sum',
-        'population': 'first',
-        'rate_per_1000': 'mean'
-    }).reset_index()
+    dept_comparison = department_summary(region_data, schema)
     
     dept_comparison = dept_comparison.sort_values('rate_per_1000', ascending=False)
     
-    fig = px.bar(
+    fig = cached_figure(
+        'bar',
         dept_comparison,
         x='Department_name',
         y='rate_per_1000',
         color='rate_per_1000',
         color_continuous_scale='Viridis',
-        title=f"Deposition Rates by Department in {region_name}"
-    )
-    
-    fig.update_layout(
-        xaxis_title="Department",
-        yaxis_title="Rate per 1,000 inhabitants",
-        xaxis_tickangle=45
+        title=f"Deposition Rates by Department in {region_name}",
+        layout=dict(
+            xaxis_title="Department",
+            yaxis_title="Rate per 1,000 inhabitants",
+            xaxis_tickangle=45
+        )
     )
     
     st.plotly_chart(fig, use_container_width=True)
@@ -718,33 +1060,35 @@ def show_region_crime_distribution(region_data, region_name):
     """Show crime type distribution within the selected region."""
     st.markdown(f"#### 🚨 {region_name} - Crime Type Distribution")
     
-    crime_distribution = region_data.groupby('crime_type')['amount'].sum().sort_values(ascending=False)
+    crime_distribution = crime_type_amounts(region_data)
     
     col1, col2 = st.columns(2)
     
     with col1:
-        fig_pie = px.pie(
+        fig_pie = cached_figure(
+            'pie',
             values=crime_distribution.values,
             names=crime_distribution.index,
             title=f"Crime Types in {region_name}",
-            hole=0.4
+            hole=0.4,
+            layout=dict(height=400)
         )
-        fig_pie.update_layout(height=400)
         st.plotly_chart(fig_pie, use_container_width=True)
     
     with col2:
-        fig_bar = px.bar(
+        fig_bar = cached_figure(
+            'bar',
             x=crime_distribution.values,
             y=crime_distribution.index,
             orientation='h',
             title=f"Crime Volume by Type",
             color=crime_distribution.values,
-            color_continuous_scale='Purples'
-        )
-        fig_bar.update_layout(
-            xaxis_title="Number of Depositions",
-            yaxis_title="Crime Type",
-            height=400
+            color_continuous_scale='Purples',
+            layout=dict(
+                xaxis_title="Number of Depositions",
+                yaxis_title="Crime Type",
+                height=400
+            )
         )
         st.plotly_chart(fig_bar, use_container_width=True)
 
@@ -752,30 +1096,26 @@ def show_region_entity_distribution(region_data, region_name):
     """Show entity distribution within the selected region."""
     st.markdown(f"#### 👥 {region_name} - Entity Distribution")
     
-    entity_distribution = region_data.groupby('entity_involved')['amount'].sum()
+    summary = entity_summary(region_data)
     
-    fig = px.pie(
-        values=entity_distribution.values,
-        names=entity_distribution.index,
+    fig = cached_figure(
+        'pie',
+        values=summary['amount'].values,
+        names=summary.index,
         title=f"Depositions by Entity Type in {region_name}",
-        hole=0.5
-    )
-    
-    fig.update_traces(
-        textinfo='label+percent+value',
-        textposition='auto'
+        hole=0.5,
+        traces=dict(
+            textinfo='label+percent+value',
+            textposition='auto'
+        )
     )
     
     st.plotly_chart(fig, use_container_width=True)
     
 
-    entity_summary = region_data.groupby('entity_involved').agg({
-        'amount': ['sum', 'count'],
-        'rate_per_1000': 'mean'
-    }).round(2)
-    
-    entity_summary.columns = ['Total Depositions', 'Record Count', 'Avg Rate/1000']
-    st.dataframe(entity_summary)
+    summary = summary.round(2)
+    summary.columns = ['Total Depositions', 'Record Count', 'Avg Rate/1000']
+    st.dataframe(summary)
 
 def show_region_temporal_trends(region_data, region_name):
     """Show temporal trends within the selected region."""
@@ -783,40 +1123,38 @@ def show_region_temporal_trends(region_data, region_name):
     
     # Debug: Show what we're working with
     st.markdown("**🔍 Data Overview:**")
-    yearly_by_entity = region_data.groupby(['year', 'entity_involved'])['amount'].sum().reset_index()
+    yearly_by_entity, yearly_trends = yearly_amounts(region_data)
     
-    fig_stacked = px.bar(
+    fig_stacked = cached_figure(
+        'bar',
         yearly_by_entity,
         x='year',
         y='amount',
         color='entity_involved',
         title=f"Depositions by Entity Type Over Time in {region_name}",
-        labels={'amount': 'Number of Depositions', 'year': 'Year'}
-    )
-    
-    fig_stacked.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Number of Depositions",
-        legend_title="Entity Type"
+        labels={'amount': 'Number of Depositions', 'year': 'Year'},
+        layout=dict(
+            xaxis_title="Year",
+            yaxis_title="Number of Depositions",
+            legend_title="Entity Type"
+        )
     )
     
     st.plotly_chart(fig_stacked, use_container_width=True)
     
     # Overall trend line
-    yearly_trends = region_data.groupby('year')['amount'].sum().reset_index()
-    
-    fig_line = px.line(
+    fig_line = cached_figure(
+        'line',
         yearly_trends,
         x='year',
         y='amount',
         title=f"Total Depositions Trend in {region_name}",
-        markers=True
-    )
-    
-    fig_line.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Total Depositions",
-        hovermode='x unified'
+        markers=True,
+        layout=dict(
+            xaxis_title="Year",
+            yaxis_title="Total Depositions",
+            hovermode='x unified'
+        )
     )
     
     st.plotly_chart(fig_line, use_container_width=True)
@@ -838,7 +1176,7 @@ def show_region_temporal_trends(region_data, region_name):
     **Average per year:** {yearly_trends['amount'].mean():,.0f} depositions
     """)
 
-def show_crime_analysis_by_demographics(filtered_data):
+def show_crime_analysis_by_demographics(schema, filtered_data):
     """Display crime analysis by population and housing situation."""
     st.markdown("#### 🏠👥 Crime Analysis by Demographics")
     
@@ -850,7 +1188,7 @@ def show_crime_analysis_by_demographics(filtered_data):
     )
 
     if selected_crime == 'All':
-        analysis_data = filtered_data.copy()
+        analysis_data = filtered_data
         chart_title_suffix = "All Crime Types"
     else:
         analysis_data = get_records_by_crime_type(filtered_data, selected_crime)
@@ -860,18 +1198,17 @@ def show_crime_analysis_by_demographics(filtered_data):
             st.warning(f"⚠️ No data available for {selected_crime} with current filters.")
             return
     
+    # One department aggregate serves both charts
+    dept_analysis = department_summary(analysis_data, schema, population=True)
+
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("**📊 Crime Amount vs Population**")
-        pop_analysis = analysis_data.groupby('Department_name').agg({
-            'amount': 'sum',
-            'population': 'first', 
-            'rate_per_1000': 'mean'
-        }).reset_index()
         
-        fig_pop = px.scatter(
-            pop_analysis,
+        fig_pop = cached_figure(
+            'scatter',
+            dept_analysis,
             x='population',
             y='amount',
             size='rate_per_1000',
@@ -888,14 +1225,13 @@ def show_crime_analysis_by_demographics(filtered_data):
                 'rate_per_1000': 'Rate per 1,000'
             },
             color='rate_per_1000',
-            color_continuous_scale='Reds'
-        )
-        
-        fig_pop.update_layout(
-            height=400,
-            xaxis_title="Population",
-            yaxis_title="Crime Amount",
-            showlegend=False
+            color_continuous_scale='Reds',
+            layout=dict(
+                height=400,
+                xaxis_title="Population",
+                yaxis_title="Crime Amount",
+                showlegend=False
+            )
         )
         
         st.plotly_chart(fig_pop, use_container_width=True)
@@ -903,15 +1239,9 @@ def show_crime_analysis_by_demographics(filtered_data):
     with col2:
         st.markdown("**🏘️ Crime Amount vs Housing Units**")
         
-        housing_analysis = analysis_data.groupby('Department_name').agg({
-            'amount': 'sum',
-            'population': 'first',
-            'housing': 'first', 
-            'rate_per_1000': 'mean'
-        }).reset_index()
-        
-        fig_housing = px.scatter(
-            housing_analysis,
+        fig_housing = cached_figure(
+            'scatter',
+            dept_analysis,
             x='housing',
             y='amount',
             size='rate_per_1000',
@@ -929,14 +1259,13 @@ def show_crime_analysis_by_demographics(filtered_data):
                 'rate_per_1000': 'Rate per 1,000'
             },
             color='rate_per_1000',
-            color_continuous_scale='Viridis'
-        )
-        
-        fig_housing.update_layout(
-            height=400,
-            xaxis_title="Number of Housing Units",
-            yaxis_title="Crime Amount",
-            showlegend=False
+            color_continuous_scale='Viridis',
+            layout=dict(
+                height=400,
+                xaxis_title="Number of Housing Units",
+                yaxis_title="Crime Amount",
+                showlegend=False
+            )
         )
         
         st.plotly_chart(fig_housing, use_container_width=True)
@@ -948,19 +1277,65 @@ def show_crime_analysis_by_demographics(filtered_data):
     - Certain types of crimes seem to be less influenced by the density of population and housing units, however, indicating that other factors may be at play.
     """)
 
-def show_deep_drives(data):
-    region_data, region_name = select_region_for_analysis(data)
+# --------------------------------------------------------------
+# Deep-dive warm-up
+# --------------------------------------------------------------
+WARM_UP_WORKERS = 4
+
+@dataclass
+class WarmUp:
+    """Background precomputation of the regional deep dives: one future per region."""
+    futures: dict
+
+    @property
+    def done(self) -> int:
+        return sum(future.done() for future in self.futures.values())
+
+    @property
+    def failed(self) -> list:
+        return [region for region, future in self.futures.items() if future.done() and future.exception()]
+
+def warm_region(schema, region_name):
+    """Fill the caches behind the deep dive of one region (aggregates and map)."""
+    department_comparison(schema, schema.version, region_name)
+    if MAP_BACKEND != "pydeck":
+        department_map_html(schema, schema.version, region_name)
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up(_schema, version) -> WarmUp:
+    """
+    Start precomputing every region of the dataset in a thread pool, once per
+    dataset version, and return at once; the pages keep serving meanwhile.
+    """
+    region_baseline(_schema, version)
+    executor = ThreadPoolExecutor(max_workers=WARM_UP_WORKERS, thread_name_prefix="warm-up")
+    futures = {region: executor.submit(warm_region, _schema, region) for region in _schema.regions['Region_name']}
+    executor.shutdown(wait=False)
+    return WarmUp(futures)
+
+def show_warm_up_progress(warm_up):
+    """Show the progress of the warm-up until every region is ready."""
+    done, total = warm_up.done, len(warm_up.futures)
+    if done < total:
+        st.progress(done / total, text=f"⏳ Preparing regional analyses in the background: {done}/{total}")
+    elif warm_up.failed:
+        st.caption(f"Warm-up failed for: {', '.join(warm_up.failed)}")
+
+def show_deep_drives(schema):
+    # Department-level cube rows for the per-department views, region roll-up for the rest
+    region_data, region_name = select_region_for_analysis(schema)
+    region_totals = get_records_by_region(schema, 'region', region_name)
     st.write("---")
-    show_region_overview(data, region_data, region_name)
+    show_region_overview(schema, region_name)
     st.write("---")
-    show_region_departments_comparison(region_data, region_name)
+    show_region_departments_comparison(schema, region_name)
     st.write("---")
-    show_region_departments_bar_chart(region_data, region_name)
+    show_region_departments_bar_chart(schema, region_data, region_name)
     st.write("---")
-    show_region_crime_distribution(region_data, region_name)
+    show_region_crime_distribution(region_totals, region_name)
     st.write("---")
-    show_region_entity_distribution(region_data, region_name)
+    show_region_entity_distribution(region_totals, region_name)
     st.write("---")
-    show_region_temporal_trends(region_data, region_name)
+    show_region_temporal_trends(region_totals, region_name)
     st.write("---")
-    show_crime_analysis_by_demographics(region_data)
\ No newline at end of file
+    show_crime_analysis_by_demographics(schema, region_data)
\ No newline at end of file